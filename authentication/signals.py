@@ -3,6 +3,9 @@ from django.db.models import signals
 from django.dispatch import receiver
 
 from authentication.models import UserGUISettings
+from authentication.statistics import invalidate_category_user_statistics, invalidate_user_statistics
+from cards.models import Card
+from categories.models import Category, ShareContract
 
 
 @receiver(signals.post_save, sender=User)
@@ -11,3 +14,28 @@ def create_user_gui_settings(instance, created, **kwargs):
     """
     if created:
         UserGUISettings.objects.create(user=instance)
+
+
+@receiver(signals.post_save, sender=Card)
+@receiver(signals.post_delete, sender=Card)
+def invalidate_user_statistics_for_card(instance, created=True, **kwargs):
+    """Invalidates the statistics of all users of a category if one of its cards has been created or deleted
+    """
+    if created:
+        invalidate_category_user_statistics(instance.category_id)
+
+
+@receiver(signals.post_save, sender=Category)
+@receiver(signals.post_delete, sender=Category)
+def invalidate_user_statistics_for_category(instance, **kwargs):
+    """Invalidates the statistics of the owner if a category has been created, changed or deleted
+    """
+    invalidate_user_statistics([instance.owner_id])
+
+
+@receiver(signals.post_save, sender=ShareContract)
+@receiver(signals.post_delete, sender=ShareContract)
+def invalidate_user_statistics_for_share_contract(instance, **kwargs):
+    """Invalidates the statistics of the user if a share contract has been changed or deleted
+    """
+    invalidate_user_statistics([instance.user_id])
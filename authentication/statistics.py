@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from braindump.counters import get_area_histogram
+from braindump.models import CardPlacement
+from cards.models import Card
+from categories.models import Category
+
+
+def _get_user_statistics_key(user_pk):
+    return 'user-statistics:{}'.format(user_pk)
+
+
+def get_user_statistics(user):
+    """Returns the number of owned and shared categories and cards of a user
+
+    The counters are computed using three aggregate queries and cached until a card, category or share contract of the
+    user changes. Owned cards include the original cards of the user's category forks which have not been copied yet
+    (see braindump.forks).
+    """
+    key = _get_user_statistics_key(user.pk)
+    statistics = cache.get(key)
+    if statistics is not None:
+        return statistics
+
+    is_owned = Q(owner=user)
+    statistics = Category.accessible_objects.all(user).aggregate(
+        owned_category_count=Count('pk', filter=is_owned),
+        shared_category_count=Count('pk', filter=~is_owned),
+    )
+
+    is_owned = Q(category__owner=user)
+    statistics.update(Card.accessible_objects.all(user).aggregate(
+        owned_card_count=Count('pk', filter=is_owned),
+        shared_card_count=Count('pk', filter=~is_owned),
+    ))
+    statistics['owned_card_count'] += CardPlacement.user_objects.all(user).filter(category__owner=user).exclude(
+        card__category_id=F('category_id'),
+    ).count()
+
+    statistics['total_category_count'] = statistics['owned_category_count'] + statistics['shared_category_count']
+    statistics['total_card_count'] = statistics['owned_card_count'] + statistics['shared_card_count']
+
+    cache.set(key, statistics, timeout=settings.AUTHENTICATION_STATISTICS_CACHE_TIMEOUT)
+    return statistics
+
+
+def get_card_placement_statistics(user):
+    """Returns the number of the user's card placements per area and the number of cards which are due today
+
+    The breakdown changes with every answer, so it is not cached. The areas are read from the counters (see
+    braindump.counters), but the due cards depend on the time and have to be counted.
+    """
+    end_of_today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    area_histogram = get_area_histogram(user)
+    statistics = dict(('area{}'.format(area), area_histogram.get(area, 0)) for area in range(1, 7))
+    statistics['due_card_count'] = CardPlacement.user_objects.all(user).filter(
+        postpone_until__lt=end_of_today,
+    ).count()
+
+    if settings.BRAINDUMP_LAZY_CARD_PLACEMENTS:
+        # Cards which have not been placed for the user yet are due and in area 1:
+        unplaced_card_count = Card.unplaced_objects.all(user).filter(
+            category__in=Category.shared_objects.all(user).values('pk'),
+        ).count()
+        statistics['area1'] += unplaced_card_count
+        statistics['due_card_count'] += unplaced_card_count
+
+    return statistics
+
+
+def invalidate_user_statistics(user_pks):
+    """Removes the cached statistics of the given users as soon as the current transaction has been committed
+    """
+    keys = [_get_user_statistics_key(user_pk) for user_pk in set(user_pks)]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_category_user_statistics(category_pk):
+    """Removes the cached statistics of the owner and all users of a category (using one query)
+    """
+    category_list = Category.objects.filter(pk=category_pk).order_by()
+    invalidate_user_statistics(category_list.values_list('owner_id', flat=True).union(
+        category_list.filter(share_contracts__accepted=True).values_list('share_contracts__user_id', flat=True),
+    ))
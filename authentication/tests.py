@@ -0,0 +1,104 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from authentication.statistics import get_user_statistics
+from braindump.tests import run_on_commit_callbacks
+from cards.models import Card
+from categories.models import Category, CategoryFork, ShareContract
+
+
+class AuthenticationTestCase(TestCase):
+    def setUp(self):
+        """Set up test scenario
+        """
+        cache.clear()
+        self.test_user = User.objects.create_user('test')
+        self.test_category = Category.objects.create(name='Category 1', description='Description 1',
+                                                     owner=self.test_user)
+        self.client = Client()
+        self.client.force_login(self.test_user)
+
+        self.foreign_test_user = User.objects.create_user('profile foreigner')
+        self.foreign_test_category = Category.objects.create(name='Category Foreign', description='Description Foreign',
+                                                             owner=self.foreign_test_user)
+        self.foreign_client = Client()
+        self.foreign_client.force_login(self.foreign_test_user)
+
+    def _create_test_card(self, category=False):
+        """Create a single test card
+        """
+        if not category:
+            category = self.test_category
+        return Card.objects.create(question='Question', answer='Answer', hint='Hint', category=category)
+
+    def _get_user_statistics(self, user):
+        """Get the statistics of a user after the pending invalidations have been run
+        """
+        run_on_commit_callbacks()
+        return get_user_statistics(user)
+
+    def test_profile(self):
+        """Test if the profile shows the statistics of the user
+        """
+        self._create_test_card()
+        response = self.client.get(reverse('authentication-profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['owned_card_count'], 1)
+
+    def test_user_statistics(self):
+        """Test if the categories and cards of a user are counted by ownership and cached
+        """
+        for _ in range(3):
+            self._create_test_card()
+        self._create_test_card(category=self.foreign_test_category)
+        ShareContract.objects.create(category=self.test_category, user=self.foreign_test_user).accept()
+
+        statistics = self._get_user_statistics(self.foreign_test_user)
+        self.assertEqual(statistics['owned_category_count'], 1)
+        self.assertEqual(statistics['shared_category_count'], 1)
+        self.assertEqual(statistics['total_category_count'], 2)
+        self.assertEqual(statistics['owned_card_count'], 1)
+        self.assertEqual(statistics['shared_card_count'], 3)
+        self.assertEqual(statistics['total_card_count'], 4)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_user_statistics(self.foreign_test_user), statistics)
+
+    def test_user_statistics_invalidation(self):
+        """Test if the cached statistics are invalidated by changes of cards, categories and share contracts
+        """
+        self.assertEqual(self._get_user_statistics(self.foreign_test_user)['shared_card_count'], 0)
+
+        share_contract = ShareContract.objects.create(category=self.test_category, user=self.foreign_test_user)
+        share_contract.accept()
+        self.assertEqual(self._get_user_statistics(self.foreign_test_user)['shared_category_count'], 1)
+
+        test_card = self._create_test_card()
+        self.assertEqual(self._get_user_statistics(self.foreign_test_user)['shared_card_count'], 1)
+        self.assertEqual(self._get_user_statistics(self.test_user)['owned_card_count'], 1)
+
+        test_card.delete()
+        self.assertEqual(self._get_user_statistics(self.foreign_test_user)['shared_card_count'], 0)
+
+        Category.objects.create(name='Category 2', description='Description 2', owner=self.test_user)
+        self.assertEqual(self._get_user_statistics(self.test_user)['owned_category_count'], 2)
+
+    def test_user_statistics_of_forks(self):
+        """Test if the original cards of a category fork are counted as owned cards until they are removed
+        """
+        test_cards = [self._create_test_card() for _ in range(3)]
+        share_contract = ShareContract.objects.create(category=self.test_category, user=self.foreign_test_user)
+        share_contract.accept()
+        run_on_commit_callbacks()
+        share_contract.revoke()
+
+        statistics = self._get_user_statistics(self.foreign_test_user)
+        fork_category = CategoryFork.objects.get(origin=self.test_category).category
+        self.assertEqual(statistics['owned_card_count'], fork_category.count_cards())
+        self.assertEqual(statistics['owned_card_count'], 3)
+        self.assertEqual(statistics['shared_card_count'], 0)
+
+        self.foreign_client.post(reverse('card-delete', args=(test_cards[0].pk,)))
+        self.assertEqual(self._get_user_statistics(self.foreign_test_user)['owned_card_count'], 2)
@@ -1,7 +1,7 @@
 from django.shortcuts import get_object_or_404
 
 from authentication.models import UserGUISettings
-from categories.models import Category
+from authentication.statistics import get_card_placement_statistics, get_user_statistics
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse, reverse_lazy
@@ -24,29 +24,9 @@ class ProfileView(LoginRequiredMixin, TemplateView):
     template_name = 'auth/profile.html'
 
     def get_context_data(self, **kwargs):
-        owned_category_count = Category.owned_objects.all(self.request.user).count()
-        shared_category_count = Category.shared_objects.all(self.request.user).count()
-        total_category_count = owned_category_count + shared_category_count
-
-        owned_card_count = 0
-        for category in Category.owned_objects.all(self.request.user):
-            owned_card_count += category.cards.count()
-
-        shared_card_count = 0
-        for category in Category.shared_objects.all(self.request.user):
-            shared_card_count += category.cards.count()
-
-        total_card_count = owned_card_count + shared_card_count
-
-        context = {
-            'owned_category_count': owned_category_count,
-            'shared_category_count': shared_category_count,
-            'total_category_count': total_category_count,
-            'owned_card_count': owned_card_count,
-            'shared_card_count': shared_card_count,
-            'total_card_count': total_card_count,
-        }
-
+        context = super(ProfileView, self).get_context_data(**kwargs)
+        context.update(get_user_statistics(self.request.user))
+        context.update(get_card_placement_statistics(self.request.user))
         return context
 
 
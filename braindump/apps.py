@@ -5,4 +5,5 @@ class BraindumpConfig(AppConfig):
     name = 'braindump'
 
     def ready(self):
+        import braindump.checks
         import braindump.signals
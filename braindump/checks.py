@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from categories.checks import LOCAL_CACHE_BACKENDS
+
+
+@register()
+def check_index_tile_cache(app_configs, **kwargs):
+    """Checks if the category tiles of the Braindump index are only cached in a cache backend shared by all processes
+    """
+    cache_backend = settings.CACHES['default']['BACKEND']
+    if settings.BRAINDUMP_INDEX_TILE_CACHE_TIMEOUT and cache_backend in LOCAL_CACHE_BACKENDS:
+        return [Warning(
+            'BRAINDUMP_INDEX_TILE_CACHE_TIMEOUT is enabled without a shared cache backend, so the category tiles of '
+            'the Braindump index are not invalidated by changes made in other processes.',
+            hint='Configure a shared default cache backend (e.g. Redis or Memcached).',
+            id='braindump.W001',
+        )]
+    return []
@@ -0,0 +1,82 @@
+"""Materialized number of card placements per user, category and area
+
+The counters are maintained by every code path which creates, moves or deletes card placements: Single card placements
+are counted by CardPlacement.save() and CardPlacement.delete(), bulk operations add their deltas explicitly (or refresh
+the counters of the affected users and categories). Dashboards read the counters in O(categories) instead of counting
+the card placements.
+
+Virtual card placements (see braindump.placements) are not counted.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from braindump.models import CardPlacement, CardPlacementCounter
+
+
+def count_card_placements(card_placements):
+    """Returns the live number of card placements per user, category and area using one GROUP BY query
+    """
+    return Counter(dict(
+        ((user_pk, category_pk, area), count)
+        for user_pk, category_pk, area, count in card_placements.order_by().values_list(
+            'user_id', 'category_id', 'area',
+        ).annotate(Count('pk'))
+    ))
+
+
+def get_card_placement_deltas(card_placements, sign=1):
+    """Returns the counter deltas for adding (or removing, if sign is -1) the given card placements
+    """
+    return dict((key, sign * count) for key, count in count_card_placements(card_placements).items())
+
+
+def get_area_histogram(user, category_pk=None):
+    """Returns the number of card placements of the user per area (within one category or all categories)
+    """
+    counters = CardPlacementCounter.objects.filter(user=user)
+    if category_pk is not None:
+        counters = counters.filter(category_id=category_pk)
+    return dict(
+        (area, count) for area, count in counters.order_by().values_list('area').annotate(Sum('count')) if count
+    )
+
+
+def refresh_card_placement_counters(**filters):
+    """Recounts the counters of all card placements matching the filters (e.g. user_id and category_id)
+    """
+    with transaction.atomic():
+        CardPlacementCounter.objects.filter(**filters).delete()
+        CardPlacementCounter.objects.bulk_create(
+            CardPlacementCounter(user_id=user_pk, category_id=category_pk, area=area, count=count)
+            for (user_pk, category_pk, area), count in count_card_placements(
+                CardPlacement.objects.filter(**filters),
+            ).items()
+        )
+
+
+def rebuild_card_placement_counters():
+    """Recounts all counters
+    """
+    refresh_card_placement_counters()
+
+
+def verify_card_placement_counters():
+    """Compares all counters to the live number of card placements
+
+    Returns the mismatching counters ({(user ID, category ID, area): (counter, live number)}).
+    """
+    counted = Counter(dict(
+        ((user_pk, category_pk, area), count)
+        for user_pk, category_pk, area, count in CardPlacementCounter.objects.values_list(
+            'user_id', 'category_id', 'area', 'count',
+        )
+    ))
+    live = count_card_placements(CardPlacement.objects.all())
+
+    return dict(
+        (key, (counted[key], live[key]))
+        for key in set(counted) | set(live)
+        if counted[key] != live[key]
+    )
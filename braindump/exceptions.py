@@ -0,0 +1,2 @@
+class ReviewQueueLocked(Exception):
+    pass
@@ -0,0 +1,153 @@
+"""Copy-on-write forks of categories (see categories.models.CategoryFork)
+
+When a share contract gets revoked, the user keeps the card placements of the shared category, but their category
+becomes a fork owned by the user. The cards are not copied until they are changed in one of both categories or deleted
+from the original category.
+"""
+import logging
+from itertools import groupby
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, IntegerField, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from authentication.statistics import invalidate_category_user_statistics
+from braindump.counters import refresh_card_placement_counters
+from braindump.models import CardPlacement, CardPlacementCounter
+from braindump.utils import iterate_in_chunks
+from cards.models import Card
+from categories.models import Category, CategoryFork
+from categories.versions import bump_category_version
+
+logger = logging.getLogger(__name__)
+
+
+def get_forked_card_placements():
+    """Returns all card placements of forks which still point to an original card
+    """
+    return CardPlacement.objects.exclude(category_id=F('card__category_id'))
+
+
+def count_by_category(queryset):
+    """Builds a subquery expression counting the rows of a queryset (grouped by category)
+    """
+    queryset = queryset.order_by().values('category').annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(queryset, output_field=IntegerField()), 0)
+
+
+def get_card_count(category, owner):
+    """Builds an expression counting the cards of a category, including the original cards of a fork which have not
+    been copied yet (see Category.count_cards)
+    """
+    forked_card_placements = CardPlacement.objects.filter(category=category, user=owner).exclude(
+        card__category=category,
+    )
+    return count_by_category(Card.objects.filter(category=category)) + count_by_category(forked_card_placements)
+
+
+def remove_forked_card(card_placement):
+    """Removes an original card from a fork by deleting the card placement of the fork's owner
+    """
+    card_placement.delete()
+    invalidate_category_user_statistics(card_placement.category_id)
+
+
+def fork_category(share_contract):
+    """Forks the category of a share contract for its user and moves the user's card placements to the fork
+    """
+    batch_size = settings.BRAINDUMP_CARD_PLACEMENT_BATCH_SIZE
+    category = share_contract.category
+    user = share_contract.user
+
+    with transaction.atomic():
+        logger.info('Forking category #{} for user #{}'.format(category.pk, user.pk))
+        new_category = Category.objects.get(pk=category.pk)
+        new_category.pk = None
+        new_category.owner = user
+        new_category.save()
+        category_fork = CategoryFork.objects.create(category=new_category, origin=category)
+        logger.debug('New category is #{}'.format(new_category.pk))
+
+        CardPlacement.user_objects.all(user).filter(category=category).update(category=new_category)
+
+        # Place the cards which have not been placed for the user yet (lazy card placements):
+        card_pks = Card.unplaced_objects.all(user).filter(category=category).order_by('pk').values_list('pk', flat=True)
+        for card_pk_chunk in iterate_in_chunks(list(card_pks), batch_size):
+            CardPlacement.objects.bulk_create(
+                (CardPlacement(card_id=card_pk, category=new_category, user=user) for card_pk in card_pk_chunk),
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+
+        CardPlacementCounter.objects.filter(user=user, category=category).delete()
+        refresh_card_placement_counters(user_id=user.pk, category_id=new_category.pk)
+
+    return category_fork
+
+
+def duplicate_cards(cards, category_pk):
+    """Copies the cards into a category without creating any card placements and returns the IDs of the copies
+
+    The copies are inserted using one bulk insert if the database returns the primary keys of bulk inserts, otherwise
+    they are inserted one by one. The IDs are returned in the order of the cards.
+    """
+    copies = [
+        Card(question=card.question, answer=card.answer, hint=card.hint, question_html=card.question_html,
+             answer_html=card.answer_html, hint_html=card.hint_html, category_id=category_pk) for card in cards
+    ]
+
+    if connection.features.can_return_ids_from_bulk_insert:
+        Card.objects.bulk_create(copies)
+    else:
+        for copy in copies:
+            # The card placements are moved to the copy, so none must be created for it (see braindump.signals):
+            copy.is_fork_copy = True
+            copy.save()
+
+    return [copy.pk for copy in copies]
+
+
+def copy_forked_cards(card_placements):
+    """Copies the original cards of forked card placements into their forks and moves the card placements to the copies
+
+    Returns the new card IDs by card placement ID.
+    """
+    batch_size = settings.BRAINDUMP_CARD_PLACEMENT_BATCH_SIZE
+    card_placement_pks = list(card_placements.order_by('category_id', 'pk').values_list('pk', flat=True))
+    new_card_pks = dict()
+
+    with transaction.atomic():
+        for card_placement_pk_chunk in iterate_in_chunks(card_placement_pks, batch_size):
+            card_placement_chunk = CardPlacement.objects.filter(pk__in=card_placement_pk_chunk).select_related(
+                'card',
+            ).order_by('category_id', 'pk')
+
+            for category_pk, category_card_placements in groupby(card_placement_chunk, key=attrgetter('category_id')):
+                category_card_placements = list(category_card_placements)
+                logger.info('Copying {} forked cards into category #{}'.format(len(category_card_placements),
+                                                                               category_pk))
+                category_new_card_pks = duplicate_cards(
+                    [card_placement.card for card_placement in category_card_placements],
+                    category_pk,
+                )
+
+                # Move the card placements to the copies:
+                moved_card_placements = CardPlacement.objects.filter(
+                    pk__in=[card_placement.pk for card_placement in category_card_placements],
+                )
+                moved_card_placements.update(card_id=Case(
+                    *(When(pk=card_placement.pk, then=Value(new_card_pk))
+                      for card_placement, new_card_pk in zip(category_card_placements, category_new_card_pks)),
+                    output_field=IntegerField(),
+                ))
+                bump_category_version(category_pk)
+                invalidate_category_user_statistics(category_pk)
+
+                new_card_pks.update(
+                    (card_placement.pk, new_card_pk)
+                    for card_placement, new_card_pk in zip(category_card_placements, category_new_card_pks)
+                )
+
+    return new_card_pks
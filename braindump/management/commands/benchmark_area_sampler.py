@@ -0,0 +1,46 @@
+import timeit
+
+from django.core.management import BaseCommand
+
+from braindump.sampling import sample_area
+
+
+def sample_area_numpy(numpy, min_area=1, max_area=6):
+    """Former implementation of BraindumpViewMixin.get_probability_weighted_area
+    """
+    area_range = numpy.arange(min_area, max_area + 1)
+
+    area_probability = list()
+    for _ in range(len(area_range)):
+        area_probability.append(1 / 2 ** _)
+
+    area_probability = numpy.array(area_probability)
+    area_probability /= area_probability.sum()
+
+    return numpy.random.choice(area_range, 1, p=area_probability)[0]
+
+
+class Command(BaseCommand):
+    help = 'Compares the alias table area sampler with the former numpy implementation'
+
+    def add_arguments(self, parser):
+        """Argument handle
+        """
+        parser.add_argument('--samples', help='Number of samples per implementation', type=int, default=100000)
+
+    def handle(self, *args, **options):
+        """Command handle
+        """
+        implementations = [('alias table', lambda: sample_area(1, 6))]
+
+        try:
+            import numpy
+        except ImportError:
+            self.stdout.write(self.style.WARNING('numpy is not installed, skipping the numpy implementation'))
+        else:
+            implementations.append(('numpy', lambda: sample_area_numpy(numpy, 1, 6)))
+
+        self.stdout.write('{:<16}  {:>14}'.format('Implementation', 'µs/sample'))
+        for name, implementation in implementations:
+            duration = timeit.timeit(implementation, number=options['samples'])
+            self.stdout.write('{:<16}  {:>14.3f}'.format(name, duration / options['samples'] * 1000000))
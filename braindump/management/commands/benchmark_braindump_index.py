@@ -0,0 +1,67 @@
+import random
+import timeit
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from braindump.views.gui import BraindumpIndex
+from cards.models import Card
+from categories.models import Category
+from categories.versions import bump_category_access_version, bump_category_version
+
+
+class Command(BaseCommand):
+    help = 'Measures the rendering of the Braindump index with and without cached category tiles (synthetic data ' \
+           'is rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        """Argument handle
+        """
+        parser.add_argument('--categories', help='Number of categories of the user', type=int, default=200)
+        parser.add_argument('--cards', help='Number of cards per category', type=int, default=10)
+        parser.add_argument('--repeat', help='Number of measured renderings per method', type=int, default=10)
+
+    def handle(self, *args, **options):
+        """Command handle
+        """
+        self.stdout.write('{:>10}  {:<12}  {:>10}'.format('Categories', 'Method', 'Seconds'))
+        with transaction.atomic():
+            user = self._create_user(options['categories'], options['cards'])
+            category_pks = list(Category.owned_objects.all(user).values_list('pk', flat=True))
+
+            with override_settings(BRAINDUMP_INDEX_TILE_CACHE_TIMEOUT=0):
+                self._measure(user, 'uncached', options['categories'], options['repeat'])
+            tile_cache_timeout = settings.BRAINDUMP_INDEX_TILE_CACHE_TIMEOUT or 3600
+            with override_settings(BRAINDUMP_INDEX_TILE_CACHE_TIMEOUT=tile_cache_timeout):
+                self._measure(user, 'first visit', options['categories'], 1)
+                self._measure(user, 'cached', options['categories'], options['repeat'])
+            transaction.set_rollback(True)
+
+        # The IDs of the synthetic categories will be used again, so their cached tiles must not match anymore:
+        for category_pk in category_pks:
+            bump_category_version(category_pk)
+        bump_category_access_version(user.pk)
+
+    def _measure(self, user, name, category_count, repeat):
+        """Renders the index of the user and prints the average duration
+        """
+        request = RequestFactory().get('/')
+        request.user = user
+        view = BraindumpIndex.as_view()
+        duration = timeit.timeit(lambda: view(request).render(), number=repeat)
+        self.stdout.write('{:>10}  {:<12}  {:>10.4f}'.format(category_count, name, duration / repeat))
+
+    def _create_user(self, category_count, card_count):
+        """Creates a synthetic user owning categories containing cards (the cards are created using their signals)
+        """
+        user = User.objects.create_user('benchmark-user-{}'.format(random.getrandbits(64)))
+        for i in range(category_count):
+            category = Category.objects.create(name='Benchmark {}'.format(i), owner=user,
+                                               description='*Benchmark* category with a **Markdown** description')
+            for _ in range(card_count):
+                Card.objects.create(question='Question', answer='Answer', category=category)
+        return user
@@ -0,0 +1,64 @@
+import random
+import timeit
+
+from django.contrib.auth.models import User
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from braindump.models import CardPlacement
+from cards.models import Card
+from categories.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Compares the card selectors across different deck sizes (synthetic data is rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        """Argument handle
+        """
+        parser.add_argument('--deck-sizes', help='Comma separated list of deck sizes', default='100,1000,10000,50000')
+        parser.add_argument('--selections', help='Number of selections per selector and deck size', type=int,
+                            default=100)
+        parser.add_argument('--selectors', help='Comma separated list of card selector classes',
+                            default='braindump.selectors.RandomOrderCardSelector,'
+                                    'braindump.selectors.RandomKeyCardSelector')
+
+    def handle(self, *args, **options):
+        """Command handle
+        """
+        deck_sizes = [int(deck_size) for deck_size in options['deck_sizes'].split(',')]
+        selectors = [(path.rsplit('.', 1)[-1], import_string(path)()) for path in options['selectors'].split(',')]
+
+        self.stdout.write('{:>10}  {:<32}  {:>12}'.format('Deck size', 'Selector', 'ms/selection'))
+        for deck_size in deck_sizes:
+            with transaction.atomic():
+                user, category = self._create_deck(deck_size)
+                for name, selector in selectors:
+                    duration = timeit.timeit(
+                        lambda: selector.select(CardPlacement.user_objects.all(user).filter(
+                            category=category,
+                            area=random.randint(1, 6),
+                        )),
+                        number=options['selections'],
+                    )
+                    self.stdout.write('{:>10}  {:<32}  {:>12.3f}'.format(
+                        deck_size, name, duration / options['selections'] * 1000
+                    ))
+                transaction.set_rollback(True)
+
+    def _create_deck(self, deck_size):
+        """Creates a synthetic deck with randomly distributed card placements (bypasses the card signals)
+        """
+        user = User.objects.create_user('benchmark-{}'.format(random.getrandbits(64)))
+        category = Category.objects.create(name='Benchmark', description='Benchmark', owner=user)
+        Card.objects.bulk_create(
+            (Card(question='Question', answer='Answer', category=category) for _ in range(deck_size)),
+            batch_size=500,
+        )
+        CardPlacement.objects.bulk_create(
+            (CardPlacement(card_id=card_pk, category=category, user=user, area=random.randint(1, 6))
+             for card_pk in category.cards.values_list('pk', flat=True).iterator()),
+            batch_size=500,
+        )
+        return user, category
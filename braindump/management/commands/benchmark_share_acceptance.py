@@ -0,0 +1,66 @@
+import random
+import timeit
+
+from django.contrib.auth.models import User
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from braindump.models import CardPlacement
+from braindump.tasks import create_card_placements_for_shared_category
+from cards.models import Card
+from categories.models import Category, ShareContract
+
+
+def create_card_placements_for_shared_category_legacy(share_contract):
+    """Former implementation of braindump.tasks.create_card_placements_for_shared_category
+    """
+    for card in share_contract.category.cards.all():
+        CardPlacement.objects.create(
+            card=card,
+            category=share_contract.category,
+            user=share_contract.user,
+        )
+
+
+class Command(BaseCommand):
+    help = 'Measures the card placement creation for accepted share contracts (synthetic data is rolled back ' \
+           'afterwards)'
+
+    def add_arguments(self, parser):
+        """Argument handle
+        """
+        parser.add_argument('--deck-size', help='Number of cards of the shared category', type=int, default=50000)
+        parser.add_argument('--legacy', help='Measure the former implementation as well', action='store_true')
+
+    def handle(self, *args, **options):
+        """Command handle
+        """
+        implementations = [('bulk_create', create_card_placements_for_shared_category)]
+        if options['legacy']:
+            implementations.append(('create', create_card_placements_for_shared_category_legacy))
+
+        self.stdout.write('{:>10}  {:<12}  {:>10}  {:>12}'.format('Deck size', 'Method', 'Seconds', 'Placements'))
+        for name, implementation in implementations:
+            with transaction.atomic():
+                share_contract = self._create_share_contract(options['deck_size'])
+                duration = timeit.timeit(lambda: implementation(share_contract), number=1)
+                self.stdout.write('{:>10}  {:<12}  {:>10.3f}  {:>12}'.format(
+                    options['deck_size'],
+                    name,
+                    duration,
+                    CardPlacement.user_objects.all(share_contract.user).count(),
+                ))
+                transaction.set_rollback(True)
+
+    def _create_share_contract(self, deck_size):
+        """Creates a synthetic category and a share contract with a second user (bypasses the card signals)
+        """
+        suffix = random.getrandbits(64)
+        owner = User.objects.create_user('benchmark-owner-{}'.format(suffix))
+        user = User.objects.create_user('benchmark-user-{}'.format(suffix))
+        category = Category.objects.create(name='Benchmark', description='Benchmark', owner=owner)
+        Card.objects.bulk_create(
+            (Card(question='Question', answer='Answer', category=category) for _ in range(deck_size)),
+            batch_size=500,
+        )
+        return ShareContract(category=category, user=user)
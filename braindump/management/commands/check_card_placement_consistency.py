@@ -1,5 +1,6 @@
 import sys
 
+from django.conf import settings
 from django.core.management import BaseCommand
 
 from braindump.models import CardPlacement
@@ -33,8 +34,13 @@ class Command(BaseCommand):
         self.stdout.write('')
         self.stdout.write('----------------------------------------')
         self.stdout.write('Checking card placements for users of shared categories')
-        check_category_users = self._check_category_users()
-        self._format_category_results(check_category_users)
+        if settings.BRAINDUMP_LAZY_CARD_PLACEMENTS:
+            # Missing card placements of shared users are virtual:
+            self.stdout.write('Skipped, because lazy card placements are enabled')
+            check_category_users = list()
+        else:
+            check_category_users = self._check_category_users()
+            self._format_category_results(check_category_users)
 
         if options['repair']:
             self.stdout.write('')
@@ -44,6 +50,7 @@ class Command(BaseCommand):
                 for nok in result.nok:
                     card_placement = CardPlacement.objects.create(
                         card=nok[0],
+                        category=nok[0].category,
                         user=nok[1],
                     )
                     self.stdout.write(self.style.SUCCESS('Created %s for result %s' % (card_placement, nok)))
@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from braindump.counters import get_card_placement_deltas
+from braindump.models import CardPlacement, CardPlacementCounter
+
+
+class Command(BaseCommand):
+    help = 'Deletes card placements of shared users which are equivalent to virtual ones (area 1, not postponed)'
+
+    def add_arguments(self, parser):
+        """Argument handle
+        """
+        parser.add_argument('--days', help='Keep card placements which have been used within this number of days',
+                            type=int, default=30)
+        parser.add_argument('--dry-run', help='Only count the card placements', action='store_true')
+
+    def handle(self, *args, **options):
+        """Command handle
+        """
+        if not settings.BRAINDUMP_LAZY_CARD_PLACEMENTS:
+            raise CommandError('Lazy card placements are disabled (see BRAINDUMP_LAZY_CARD_PLACEMENTS)')
+
+        now = timezone.now()
+        card_placements = CardPlacement.objects.filter(
+            area=1,
+            postpone_until__lte=now,
+            last_interaction__lt=now - timedelta(days=options['days']),
+        ).exclude(category__owner=F('user'))
+
+        if options['dry_run']:
+            self.stdout.write('{} card placements can be deleted'.format(card_placements.count()))
+        else:
+            with transaction.atomic():
+                CardPlacementCounter.objects.add(get_card_placement_deltas(card_placements, sign=-1))
+                deleted, _ = card_placements.delete()
+            self.stdout.write(self.style.SUCCESS('Deleted {} card placements'.format(deleted)))
@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand, CommandError
+
+from braindump.counters import rebuild_card_placement_counters, verify_card_placement_counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the card placement counters and verifies them against the card placements'
+
+    def add_arguments(self, parser):
+        """Argument handle
+        """
+        parser.add_argument('--verify-only', help='Only verify the counters', action='store_true')
+
+    def handle(self, *args, **options):
+        """Command handle
+        """
+        if not options['verify_only']:
+            rebuild_card_placement_counters()
+            self.stdout.write('Rebuilt card placement counters')
+
+        mismatches = verify_card_placement_counters()
+        for (user_pk, category_pk, area), (counted, live) in sorted(mismatches.items()):
+            self.stdout.write('User #{}, category #{}, area {}: counted {}, but found {} card placements'.format(
+                user_pk, category_pk, area, counted, live,
+            ))
+
+        if mismatches:
+            raise CommandError('{} card placement counters are inconsistent'.format(len(mismatches)))
+        self.stdout.write(self.style.SUCCESS('All card placement counters are consistent'))
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:28
+
+import random
+
+import braindump.models
+from django.db import migrations, models
+
+
+def generate_random_keys(apps, schema_editor):
+    """Generates individual random keys for existing card placements (AddField assigns the same default to all rows)
+    """
+    CardPlacement = apps.get_model('braindump', 'CardPlacement')
+
+    batch = list()
+    for card_placement in CardPlacement.objects.only('pk').iterator():
+        card_placement.random_key = random.random()
+        batch.append(card_placement)
+        if len(batch) >= 1000:
+            CardPlacement.objects.bulk_update(batch, ['random_key'])
+            batch = list()
+    CardPlacement.objects.bulk_update(batch, ['random_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('braindump', '0005_auto_20181207_0528'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cardplacement',
+            name='random_key',
+            field=models.FloatField(default=braindump.models.generate_random_key, editable=False),
+        ),
+        migrations.RunPython(generate_random_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cardplacement',
+            index=models.Index(fields=['user', 'area', 'random_key'], name='braindump_c_user_id_182e12_idx'),
+        ),
+    ]
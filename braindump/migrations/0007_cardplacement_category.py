@@ -0,0 +1,58 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:29
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+BACKFILL_BATCH_SIZE = 10000
+
+
+def backfill_category(apps, schema_editor):
+    """Copies the category of the card into the card placement (in batches of primary key ranges)
+    """
+    Card = apps.get_model('cards', 'Card')
+    CardPlacement = apps.get_model('braindump', 'CardPlacement')
+
+    max_pk = CardPlacement.objects.aggregate(max_pk=models.Max('pk'))['max_pk'] or 0
+    for batch_start in range(0, max_pk + 1, BACKFILL_BATCH_SIZE):
+        CardPlacement.objects.filter(
+            pk__gte=batch_start,
+            pk__lt=batch_start + BACKFILL_BATCH_SIZE,
+        ).update(
+            category_id=Subquery(Card.objects.filter(pk=OuterRef('card_id')).values('category_id')[:1]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0014_auto_20180411_0324'),
+        ('categories', '0012_sharecontract_revoked'),
+        ('braindump', '0006_cardplacement_random_key'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cardplacement',
+            name='braindump_c_user_id_182e12_idx',
+        ),
+        migrations.AddField(
+            model_name='cardplacement',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='card_placements', to='categories.Category'),
+        ),
+        migrations.RunPython(backfill_category, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='cardplacement',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='card_placements', to='categories.Category'),
+        ),
+        migrations.AddIndex(
+            model_name='cardplacement',
+            index=models.Index(fields=['user', 'category', 'area', 'postpone_until'], name='braindump_c_user_id_51e530_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cardplacement',
+            index=models.Index(fields=['user', 'category', 'area', 'random_key'], name='braindump_c_user_id_33faf8_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:42
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('braindump', '0007_cardplacement_category'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cardplacement',
+            name='last_interaction',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, editable=False),
+        ),
+    ]
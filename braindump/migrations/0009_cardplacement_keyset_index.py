@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('braindump', '0008_cardplacement_last_interaction_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cardplacement',
+            index=models.Index(fields=['user', 'area', 'id'], name='braindump_c_user_id_fca14a_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:57
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def count_card_placements(apps, schema_editor):
+    """Counts the existing card placements per user, category and area
+    """
+    CardPlacement = apps.get_model('braindump', 'CardPlacement')
+    CardPlacementCounter = apps.get_model('braindump', 'CardPlacementCounter')
+
+    CardPlacementCounter.objects.bulk_create(
+        (
+            CardPlacementCounter(user_id=user_pk, category_id=category_pk, area=area, count=count)
+            for user_pk, category_pk, area, count in CardPlacement.objects.order_by().values_list(
+                'user_id', 'category_id', 'area',
+            ).annotate(Count('pk')).iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('categories', '0014_category_keyset_index'),
+        ('braindump', '0009_cardplacement_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CardPlacementCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('area', models.IntegerField(choices=[(1, '1'), (2, '2'), (3, '3'), (4, '4'), (5, '5'), (6, '6')])),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='card_placement_counters', to='categories.Category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'category', 'area')},
+            },
+        ),
+        migrations.RunPython(count_card_placements, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,19 @@
+import random
+from collections import defaultdict
+
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 
+from braindump.utils import iterate_in_chunks
+
+
+def generate_random_key():
+    """Generates a random key used for index-backed random selection of card placements
+    """
+    return random.random()
+
 
 class CardPlacementUserManager(models.Manager):
     def all(self, user):
@@ -15,6 +27,19 @@ class CardPlacementUserManager(models.Manager):
         return self.filter(user=user).get(*args, **kwargs)
 
 
+class CardPlacementDueManager(models.Manager):
+    def all(self, user, category_pk, min_area=1, max_area=6):
+        """Returns all card placements of a category belonging to the user which are due for a Braindump session
+        """
+        return self.filter(
+            user=user,
+            category_id=category_pk,
+            area__gte=min_area,
+            area__lte=max_area,
+            postpone_until__lte=timezone.now(),
+        ).all()
+
+
 class CardPlacementCardManager(models.Manager):
     def all(self, card):
         """Returns all card placements belonging to a card
@@ -45,11 +70,15 @@ class CardPlacement(models.Model):
     )
     area = models.IntegerField(default=1, choices=AREA_CHOICES, verbose_name='Area')
     card = models.ForeignKey('cards.Card', on_delete=models.CASCADE, related_name='card_placements')
+    # Denormalized category of the card (avoids joining the cards for every Braindump query):
+    category = models.ForeignKey('categories.Category', on_delete=models.CASCADE, related_name='card_placements')
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    last_interaction = models.DateTimeField(auto_now_add=True, blank=True, editable=False)
+    last_interaction = models.DateTimeField(default=timezone.now, blank=True, editable=False)
     postpone_until = models.DateTimeField(default=timezone.now, blank=True)
+    random_key = models.FloatField(default=generate_random_key, editable=False)
     objects = models.Manager()
     user_objects = CardPlacementUserManager()
+    due_objects = CardPlacementDueManager()
     card_objects = CardPlacementCardManager()
     card_user_objects = CardPlacementCardUserManager()
 
@@ -59,27 +88,72 @@ class CardPlacement(models.Model):
         indexes = [
             models.Index(fields=['user']),
             models.Index(fields=['card']),
+            models.Index(fields=['user', 'area', 'id']),
+            models.Index(fields=['user', 'category', 'area', 'postpone_until']),
+            models.Index(fields=['user', 'category', 'area', 'random_key']),
         ]
 
-    def move_forward(self):
+    # User, category and area the card placement is counted for (see CardPlacementCounter):
+    _counted_as = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded_values = dict(zip(field_names, values))
+        if all(field_name in loaded_values for field_name in ('user_id', 'category_id', 'area')):
+            instance._counted_as = (loaded_values['user_id'], loaded_values['category_id'], loaded_values['area'])
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.category_id is None:
+            self.category_id = self.card.category_id
+
+        with transaction.atomic():
+            if self._counted_as is None and not self._state.adding:
+                # The card placement has not been loaded from the database (e.g. it has been created in bulk):
+                self._counted_as = CardPlacement.objects.filter(pk=self.pk).values_list(
+                    'user_id', 'category_id', 'area',
+                ).first()
+
+            super().save(*args, **kwargs)
+            counted_as = (self.user_id, self.category_id, self.area)
+            if counted_as != self._counted_as:
+                deltas = {counted_as: 1}
+                if self._counted_as is not None:
+                    deltas[self._counted_as] = -1
+                CardPlacementCounter.objects.add(deltas)
+                self._counted_as = counted_as
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            if self._counted_as is not None:
+                CardPlacementCounter.objects.add({self._counted_as: -1})
+                self._counted_as = None
+        return result
+
+    def move_forward(self, commit=True):
         """Increase the area
         """
         if self.area < 6:
             self.area += 1
-            self.save()
+            if commit:
+                self.save()
 
-    def move_backward(self):
+    def move_backward(self, commit=True):
         """Decrease the area
         """
         if self.area > 1:
             self.area -= 1
-            self.save()
+            if commit:
+                self.save()
 
-    def reset(self):
+    def reset(self, commit=True):
         """Set card to area 1
         """
         self.area = 1
-        self.save()
+        if commit:
+            self.save()
 
     def set_last_interaction(self, last_interaction=False):
         """Set date and time of last interaction
@@ -102,3 +176,51 @@ class CardPlacement(models.Model):
         """
         self.postpone_until = timezone.now()
         self.save()
+
+
+class CardPlacementCounterManager(models.Manager):
+    def add(self, deltas):
+        """Adds deltas ({(user ID, category ID, area): delta}) to the counters and creates missing counters
+
+        Missing counters are inserted with a count of 0 (ignoring counters which have been inserted concurrently), so
+        every delta is added by the UPDATE statement. Counters sharing the same category, area and delta are updated
+        using one single UPDATE statement.
+        """
+        user_pks_by_change = defaultdict(list)
+        for (user_pk, category_pk, area), delta in deltas.items():
+            if delta:
+                user_pks_by_change[(category_pk, area, delta)].append(user_pk)
+
+        for (category_pk, area, delta), user_pks in user_pks_by_change.items():
+            for user_pk_chunk in iterate_in_chunks(user_pks, settings.BRAINDUMP_CARD_PLACEMENT_BATCH_SIZE):
+                counters = self.filter(category_id=category_pk, area=area, user_id__in=user_pk_chunk)
+                counted_user_pks = set(counters.values_list('user_id', flat=True))
+                if len(counted_user_pks) < len(user_pk_chunk):
+                    self.bulk_create(
+                        [
+                            self.model(user_id=user_pk, category_id=category_pk, area=area, count=0)
+                            for user_pk in user_pk_chunk if user_pk not in counted_user_pks
+                        ],
+                        ignore_conflicts=True,
+                    )
+                counters.update(count=F('count') + delta)
+
+    def move(self, user_pk, category_pk, previous_area, area):
+        """Moves one card placement of the user from one area to another
+        """
+        if previous_area != area:
+            self.add({(user_pk, category_pk, previous_area): -1, (user_pk, category_pk, area): 1})
+
+
+class CardPlacementCounter(models.Model):
+    """Materialized number of card placements per user, category and area (see braindump.counters)
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    category = models.ForeignKey('categories.Category', on_delete=models.CASCADE,
+                                 related_name='card_placement_counters')
+    area = models.IntegerField(choices=CardPlacement.AREA_CHOICES)
+    count = models.IntegerField(default=0)
+    objects = CardPlacementCounterManager()
+
+    class Meta:
+        unique_together = (('user', 'category', 'area'),)
@@ -0,0 +1,177 @@
+"""Lazy (virtual) card placements
+
+If BRAINDUMP_LAZY_CARD_PLACEMENTS is enabled, the card placements of shared users are not created in advance. A missing
+card placement is treated like a card placement in area 1 which has never been reviewed or postponed. It gets created
+on the first interaction of the user with the card.
+"""
+import random
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Min
+
+from braindump.models import CardPlacement, CardPlacementCounter
+from cards.models import Card
+
+
+def build_virtual_card_placement(card, user):
+    """Returns an unsaved card placement in area 1 which has never been reviewed
+    """
+    return CardPlacement(card=card, category=card.category, user=user, last_interaction=None)
+
+
+class VirtualCardPlacements:
+    """Virtual card placements of all cards in a category which have not been placed for the user yet
+    """
+    def __init__(self, user, category_pk, cards=None):
+        self.user = user
+        self.category_pk = category_pk
+        if cards is None:
+            cards = Card.unplaced_objects.all(user).filter(category_id=category_pk)
+        self.cards = cards.select_related('category').order_by('pk')
+
+    def __iter__(self):
+        for card in self.cards.iterator():
+            yield build_virtual_card_placement(card, self.user)
+
+    def count(self):
+        """Returns the number of virtual card placements
+        """
+        return self.cards.count()
+
+    def exclude(self, card_pks):
+        """Returns the virtual card placements without the ones of the given cards
+        """
+        return VirtualCardPlacements(self.user, self.category_pk, self.cards.exclude(pk__in=card_pks))
+
+    def get(self, card_pk):
+        """Returns the virtual card placement of a card (or None if the card has been placed already)
+        """
+        card = self.cards.filter(pk=card_pk).first()
+        if card is None:
+            return None
+        return build_virtual_card_placement(card, self.user)
+
+    def select(self):
+        """Returns a random virtual card placement (or None if there are none)
+
+        Seeks the first card whose ID is greater than or equal to a random ID between the lowest and the highest card
+        ID of the category and wraps around to the lowest card ID if there is none (like RandomKeyCardSelector does).
+        All lookups are index range scans instead of skipping a random number of cards.
+        """
+        card_pk_range = Card.objects.filter(category_id=self.category_pk).aggregate(Min('pk'), Max('pk'))
+        if card_pk_range['pk__min'] is None:
+            return None
+
+        card = self.cards.filter(pk__gte=random.randint(card_pk_range['pk__min'], card_pk_range['pk__max'])).first()
+        if card is None:
+            # Wrap around:
+            card = self.cards.first()
+
+        if card is None:
+            return None
+        return build_virtual_card_placement(card, self.user)
+
+    def slice(self, start, stop):
+        """Returns the virtual card placements between the given positions (ordered by card)
+
+        This is used by page number pagination, which skips the preceding rows anyway (random selection uses select()).
+        """
+        return [build_virtual_card_placement(card, self.user) for card in self.cards[start:stop]]
+
+
+class CardPlacementList:
+    """Sliceable list of virtual card placements followed by the card placements of a queryset (e.g. for pagination)
+
+    Only the requested slices are fetched from the database.
+    """
+    def __init__(self, queryset, virtual_card_placements=None):
+        self.queryset = queryset
+        self.virtual_card_placements = virtual_card_placements
+
+    def get_virtual_count(self):
+        """Returns the number of virtual card placements
+        """
+        if self.virtual_card_placements is None:
+            return 0
+        if not hasattr(self, '_virtual_count'):
+            self._virtual_count = self.virtual_card_placements.count()
+        return self._virtual_count
+
+    def count(self):
+        """Returns the number of virtual and real card placements
+        """
+        return self.get_virtual_count() + self.queryset.count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError('Only slices without step are supported.')
+
+        virtual_count = self.get_virtual_count()
+        start = key.start or 0
+        stop = key.stop if key.stop is not None else self.count()
+
+        card_placements = list()
+        if start < virtual_count:
+            card_placements += self.virtual_card_placements.slice(start, min(stop, virtual_count))
+        if stop > virtual_count:
+            card_placements += list(self.queryset[max(start - virtual_count, 0):stop - virtual_count])
+        return card_placements
+
+
+def get_virtual_card_placements(user, category_pk, min_area=1):
+    """Returns the virtual card placements of a category (or None if they are disabled or not within the area range)
+    """
+    if settings.BRAINDUMP_LAZY_CARD_PLACEMENTS and min_area == 1:
+        return VirtualCardPlacements(user, category_pk)
+    return None
+
+
+def get_unplaced_cards(user, card_pks):
+    """Returns all given cards which are accessible by the user, but have not been placed for the user yet
+    """
+    return Card.accessible_objects.all(user).filter(pk__in=card_pks).exclude(card_placements__user=user)
+
+
+def insert_card_placements(card_placements):
+    """Inserts new card placements, ignoring the ones which have been created concurrently
+
+    Returns the card placements which have actually been inserted (identified by their random keys).
+    """
+    if not card_placements:
+        return list()
+    CardPlacement.objects.bulk_create(card_placements, ignore_conflicts=True)
+    inserted_card_placements = set(CardPlacement.objects.filter(
+        card_id__in=set(card_placement.card_id for card_placement in card_placements),
+        user_id__in=set(card_placement.user_id for card_placement in card_placements),
+    ).values_list('card_id', 'user_id', 'random_key'))
+    return [
+        card_placement for card_placement in card_placements
+        if (card_placement.card_id, card_placement.user_id, card_placement.random_key) in inserted_card_placements
+    ]
+
+
+def materialize_card_placements(user, card_pks, category_pk=None):
+    """Creates the missing card placements of the user for the given cards (if lazy card placements are enabled)
+
+    Only cards of the given category are placed if a category is given. Returns the number of created card placements.
+    """
+    if not settings.BRAINDUMP_LAZY_CARD_PLACEMENTS:
+        return 0
+
+    unplaced_cards = get_unplaced_cards(user, card_pks)
+    if category_pk is not None:
+        unplaced_cards = unplaced_cards.filter(category_id=category_pk)
+
+    with transaction.atomic():
+        card_placements = insert_card_placements([
+            CardPlacement(card_id=card_pk, category_id=card_category_pk, user=user)
+            for card_pk, card_category_pk in unplaced_cards.values_list('pk', 'category_id')
+        ])
+        CardPlacementCounter.objects.add(Counter((user.pk, card_placement.category_id, 1)
+                                                 for card_placement in card_placements))
+    return len(card_placements)
@@ -0,0 +1,162 @@
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django_q.tasks import async_task
+
+from braindump.exceptions import ReviewQueueLocked
+from braindump.models import CardPlacement
+from braindump.placements import get_virtual_card_placements
+from braindump.selectors import WeightedAreaCardSelector
+from categories.versions import get_category_version
+
+
+class ReviewQueue:
+    """Pre-drawn queue of card placements for a Braindump session
+
+    The queue contains card IDs and is stored in the cache, keyed by user, category and area range. Every entry is
+    validated against the database before it gets popped, so cards which are not due anymore (e.g. moved to another
+    area) are skipped.
+    Changes of the category's content (see categories.versions) invalidate all queues of the category.
+    """
+    def __init__(self, user, category_pk, min_area=1, max_area=6):
+        self.user = user
+        self.category_pk = int(category_pk)
+        self.min_area = min_area
+        self.max_area = max_area
+
+    @staticmethod
+    def _get_cache_key(user_pk, category_pk, category_version, min_area, max_area):
+        return 'braindump-review-queue:{}:{}:{}:{}:{}'.format(
+            user_pk, category_pk, category_version, min_area, max_area
+        )
+
+    def get_cache_key(self):
+        """Returns the cache key of this queue
+        """
+        return self._get_cache_key(self.user.pk, self.category_pk, get_category_version(self.category_pk),
+                                   self.min_area, self.max_area)
+
+    def get_queryset(self):
+        """Returns all card placements which are eligible for this queue
+        """
+        return CardPlacement.due_objects.all(self.user, self.category_pk, self.min_area, self.max_area)
+
+    def get_virtual_card_placements(self):
+        """Returns all virtual card placements which are eligible for this queue (or None)
+        """
+        return get_virtual_card_placements(self.user, self.category_pk, self.min_area)
+
+    def draw(self, number=None, exclude_card_pks=()):
+        """Draws a batch of card IDs using the probability weighted areas
+        """
+        if number is None:
+            number = settings.BRAINDUMP_REVIEW_QUEUE_SIZE
+
+        virtual_card_placements = self.get_virtual_card_placements()
+        if virtual_card_placements is not None:
+            virtual_card_placements = virtual_card_placements.exclude(exclude_card_pks)
+
+        card_placements = WeightedAreaCardSelector().select_many(
+            self.get_queryset().exclude(card_id__in=exclude_card_pks),
+            number,
+            virtual_card_placements,
+        )
+        return [card_placement.card_id for card_placement in card_placements]
+
+    def refill(self):
+        """Appends freshly drawn card placements to the queue until it reaches its configured size
+
+        The cards are drawn without holding the lock, so concurrent pops are not blocked by the queries.
+        """
+        cache_key = self.get_cache_key()
+        queue = cache.get(cache_key, list())
+        missing = settings.BRAINDUMP_REVIEW_QUEUE_SIZE - len(queue)
+        if missing > 0:
+            self._extend(cache_key, self.draw(missing, exclude_card_pks=queue))
+
+    def pop(self):
+        """Returns the next due card placement of the queue (or None if there are no due cards at all)
+        """
+        cache_key = self.get_cache_key()
+        card_placement = self._pop(cache_key)
+
+        if card_placement is None:
+            # The queue was empty or contained only stale entries, so draw a new one synchronously:
+            self._extend(cache_key, self.draw())
+            card_placement = self._pop(cache_key)
+
+        return card_placement
+
+    @contextmanager
+    def _lock(self, cache_key):
+        """Serializes all changes of a queue (across processes, as long as they share the cache)
+
+        The lock expires after BRAINDUMP_REVIEW_QUEUE_LOCK_TIMEOUT seconds, so a crashed process cannot block the queue
+        forever. Waiting for the lock takes at most as long (e.g. if the cache is unreachable), afterwards
+        ReviewQueueLocked is raised.
+        """
+        lock_key = '{}:lock'.format(cache_key)
+        deadline = time.monotonic() + settings.BRAINDUMP_REVIEW_QUEUE_LOCK_TIMEOUT
+        while not cache.add(lock_key, True, timeout=settings.BRAINDUMP_REVIEW_QUEUE_LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                raise ReviewQueueLocked('Review queue {} is locked'.format(cache_key))
+            time.sleep(0.01)
+        try:
+            yield
+        finally:
+            cache.delete(lock_key)
+
+    def _extend(self, cache_key, card_pks):
+        """Appends card IDs which are not queued yet to the queue (up to its configured size)
+        """
+        with self._lock(cache_key):
+            queue = cache.get(cache_key, list())
+            queue += [card_pk for card_pk in card_pks if card_pk not in queue]
+            cache.set(cache_key, queue[:max(settings.BRAINDUMP_REVIEW_QUEUE_SIZE, 1)])
+
+    def _pop_card_pk(self, cache_key):
+        """Removes the first card ID from the queue and returns it along with the remaining length of the queue
+        """
+        with self._lock(cache_key):
+            queue = cache.get(cache_key, list())
+            if not queue:
+                return None, 0
+            card_pk = queue.pop(0)
+            cache.set(cache_key, queue)
+        return card_pk, len(queue)
+
+    def _pop(self, cache_key):
+        """Pops the first valid card placement of the queue
+
+        Every card ID is removed from the queue while holding the lock, so concurrent pops never get the same card and
+        cannot overwrite cards appended by a refill. If the queue runs low, it gets refilled by a queue worker (or
+        within the request if the cluster runs synchronously, see Q_CLUSTER).
+        """
+        card_placement = None
+        virtual_card_placements = self.get_virtual_card_placements()
+        while card_placement is None:
+            card_pk, remaining = self._pop_card_pk(cache_key)
+            if card_pk is None:
+                return None
+            card_placement = self.get_queryset().filter(card_id=card_pk).select_related('card').first()
+            if card_placement is None and virtual_card_placements is not None:
+                card_placement = virtual_card_placements.get(card_pk)
+
+        if remaining <= settings.BRAINDUMP_REVIEW_QUEUE_REFILL_THRESHOLD:
+            async_task('braindump.tasks.refill_review_queue', self.user, self.category_pk, self.min_area,
+                       self.max_area)
+
+        return card_placement
+
+    @classmethod
+    def invalidate(cls, user, category_pk):
+        """Removes all queues of a user's category (for all area ranges)
+        """
+        category_version = get_category_version(category_pk)
+        cache.delete_many([
+            cls._get_cache_key(user.pk, category_pk, category_version, min_area, max_area)
+            for min_area in range(1, 7)
+            for max_area in range(min_area, 7)
+        ])
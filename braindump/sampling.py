@@ -0,0 +1,91 @@
+"""Weighted random sampling of Braindump areas
+
+Every area is half as likely as its predecessor. Only areas which contain at least one card are eligible, so the
+weights are normalized over the non-empty areas within the selected area range.
+
+The alias tables (see https://en.wikipedia.org/wiki/Alias_method) for every combination of min area, max area and
+non-empty area mask are computed once on import, so drawing an area takes constant time.
+"""
+import random
+
+AREAS = (1, 2, 3, 4, 5, 6)
+
+
+class AliasTable:
+    """Walker's alias table for drawing one outcome out of a discrete probability distribution in O(1)
+    """
+    def __init__(self, outcomes, weights):
+        self.outcomes = tuple(outcomes)
+        self.probabilities = [0.0] * len(self.outcomes)
+        self.aliases = list(range(len(self.outcomes)))
+
+        # Scale the weights, so the average bucket is 1:
+        total = sum(weights)
+        scaled_weights = [weight * len(self.outcomes) / total for weight in weights]
+        small = [i for i, weight in enumerate(scaled_weights) if weight < 1]
+        large = [i for i, weight in enumerate(scaled_weights) if weight >= 1]
+
+        # Fill every underfull bucket with the remainder of an overfull one (Vose's variant):
+        while small and large:
+            i, j = small.pop(), large.pop()
+            self.probabilities[i] = scaled_weights[i]
+            self.aliases[i] = j
+            scaled_weights[j] -= 1 - scaled_weights[i]
+            if scaled_weights[j] < 1:
+                small.append(j)
+            else:
+                large.append(j)
+
+        # Remaining buckets are full (apart from rounding errors):
+        for i in small + large:
+            self.probabilities[i] = 1.0
+
+    def draw(self):
+        """Returns a random outcome
+        """
+        i = random.randrange(len(self.outcomes))
+        if random.random() < self.probabilities[i]:
+            return self.outcomes[i]
+        return self.outcomes[self.aliases[i]]
+
+
+def get_area_mask(areas):
+    """Returns a bit mask of the given areas (bit 0 represents area 1)
+    """
+    mask = 0
+    for area in areas:
+        mask |= 1 << (area - 1)
+    return mask
+
+
+def _build_alias_tables():
+    """Builds alias tables for all combinations of min area, max area and non-empty area mask
+    """
+    tables_by_eligible_areas = dict()
+    alias_tables = dict()
+    for min_area in AREAS:
+        for max_area in AREAS[min_area - 1:]:
+            for mask in range(1, 2 ** len(AREAS)):
+                eligible_areas = tuple(area for area in range(min_area, max_area + 1) if mask & get_area_mask((area,)))
+                if not eligible_areas:
+                    continue
+
+                # Combinations with the same eligible areas share one table:
+                if eligible_areas not in tables_by_eligible_areas:
+                    tables_by_eligible_areas[eligible_areas] = AliasTable(
+                        eligible_areas,
+                        [1 / 2 ** area for area in eligible_areas],
+                    )
+                alias_tables[(min_area, max_area, mask)] = tables_by_eligible_areas[eligible_areas]
+    return alias_tables
+
+
+ALIAS_TABLES = _build_alias_tables()
+
+
+def sample_area(min_area=1, max_area=6, non_empty_areas=AREAS):
+    """Draws a random area between min_area and max_area (every area is half as likely as its predecessor)
+
+    Raises a KeyError if none of the non-empty areas is within the area range.
+    """
+    return ALIAS_TABLES[(min_area, max_area, get_area_mask(non_empty_areas))].draw()
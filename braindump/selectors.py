@@ -0,0 +1,122 @@
+import random
+
+from django.conf import settings
+from django.db.models import Count
+from django.utils.module_loading import import_string
+
+from braindump.sampling import sample_area
+
+
+class CardSelector:
+    """Base class for strategies picking one random card placement out of a queryset
+    """
+    def select(self, queryset):
+        """Returns one random card placement of the queryset (or None if the queryset is empty)
+        """
+        raise NotImplementedError()
+
+
+class RandomOrderCardSelector(CardSelector):
+    """Picks a card placement using the database's random order
+
+    The database has to sort every matching row, so the costs are growing linearly with the size of the deck.
+    """
+    def select(self, queryset):
+        return queryset.order_by('?').first()
+
+
+class RandomKeyCardSelector(CardSelector):
+    """Picks a card placement using the indexed random key of the card placement
+
+    Seeks the first card placement whose random key is greater than or equal to a random number and wraps around to
+    the lowest random key if there is none. Both lookups are index range scans.
+    """
+    def select(self, queryset):
+        queryset = queryset.order_by('random_key')
+        card_placement = queryset.filter(random_key__gte=random.random()).first()
+
+        if card_placement is None:
+            # Wrap around:
+            card_placement = queryset.first()
+
+        return card_placement
+
+
+class WeightedAreaCardSelector(CardSelector):
+    """Picks a card placement of a probability weighted area
+
+    The number of card placements per area is fetched using one single GROUP BY query. Only areas containing at least
+    one card placement are considered, so the configured card selector always finds a card placement within the
+    randomly selected area. Virtual card placements (see braindump.placements) are counted as area 1.
+    """
+    def __init__(self, card_selector=None):
+        self.card_selector = card_selector or get_card_selector()
+
+    def get_area_histogram(self, queryset):
+        """Returns the number of card placements per area
+        """
+        return dict(queryset.order_by().values_list('area').annotate(Count('pk')))
+
+    def sample_area(self, area_histogram, virtual_count):
+        """Draws a random area out of the non-empty areas and decides whether to pick a virtual card placement
+        """
+        non_empty_areas = set(area_histogram.keys())
+        if virtual_count:
+            non_empty_areas.add(1)
+
+        randomly_selected_area = sample_area(non_empty_areas=non_empty_areas)
+        is_virtual = randomly_selected_area == 1 and \
+            random.randrange(area_histogram.get(1, 0) + virtual_count) < virtual_count
+        return randomly_selected_area, is_virtual
+
+    def select(self, queryset, virtual_card_placements=None):
+        area_histogram = self.get_area_histogram(queryset)
+        virtual_count = virtual_card_placements.count() if virtual_card_placements is not None else 0
+
+        if not area_histogram and not virtual_count:
+            return None
+
+        randomly_selected_area, is_virtual = self.sample_area(area_histogram, virtual_count)
+        if is_virtual:
+            return virtual_card_placements.select()
+        return self.card_selector.select(queryset.filter(area=randomly_selected_area))
+
+    def select_many(self, queryset, number, virtual_card_placements=None):
+        """Returns a list of card placements of distinct cards, every one of them picked like select() does
+        """
+        area_histogram = self.get_area_histogram(queryset)
+        virtual_count = virtual_card_placements.count() if virtual_card_placements is not None else 0
+
+        card_placements = list()
+        while (area_histogram or virtual_count) and len(card_placements) < number:
+            randomly_selected_area, is_virtual = self.sample_area(area_histogram, virtual_count)
+            selected_card_pks = [card_placement.card_id for card_placement in card_placements]
+
+            if is_virtual:
+                virtual_count -= 1
+                card_placement = virtual_card_placements.exclude(selected_card_pks).select()
+                if card_placement is None:
+                    virtual_count = 0
+                else:
+                    card_placements.append(card_placement)
+                continue
+
+            card_placement = self.card_selector.select(queryset.filter(area=randomly_selected_area).exclude(
+                card_id__in=selected_card_pks,
+            ))
+
+            # Remove exhausted areas from the histogram:
+            area_histogram[randomly_selected_area] -= 1
+            if card_placement is None or not area_histogram[randomly_selected_area]:
+                del area_histogram[randomly_selected_area]
+
+            if card_placement is not None:
+                card_placements.append(card_placement)
+
+        return card_placements
+
+
+def get_card_selector():
+    """Returns an instance of the card selector configured in BRAINDUMP_CARD_SELECTOR
+    """
+    return import_string(settings.BRAINDUMP_CARD_SELECTOR)()
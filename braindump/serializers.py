@@ -0,0 +1,55 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from braindump.models import CardPlacement
+from categories.models import Category
+
+
+class BraindumpCardSerializer(serializers.ModelSerializer):
+    card = serializers.IntegerField(source='card_id')
+    question_html = serializers.CharField(source='card.question_html')
+    hint_html = serializers.CharField(source='card.hint_html')
+    answer_html = serializers.CharField(source='card.answer_html')
+
+    class Meta:
+        model = CardPlacement
+        fields = ('card', 'category', 'area', 'question_html', 'hint_html', 'answer_html')
+        read_only_fields = fields
+
+
+class BraindumpAreaRangeSerializer(serializers.Serializer):
+    min_area = serializers.IntegerField(min_value=1, max_value=6, default=1)
+    max_area = serializers.IntegerField(min_value=1, max_value=6, default=6)
+
+    def validate(self, data):
+        if data['max_area'] < data['min_area']:
+            raise serializers.ValidationError('The max area cannot be lower than the min area.')
+        return data
+
+
+class BraindumpAnswerSerializer(serializers.Serializer):
+    RESULT_CHOICES = ('ok', 'nok', 'postpone')
+    card = serializers.IntegerField()
+    result = serializers.ChoiceField(choices=RESULT_CHOICES)
+    seconds = serializers.IntegerField(min_value=0, max_value=settings.BRAINDUMP_MAX_POSTPONE_SECONDS, default=900)
+
+
+class BraindumpReviewSerializer(BraindumpAnswerSerializer):
+    timestamp = serializers.DateTimeField()
+
+
+class BraindumpBundleCategorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = ('id', 'name', 'mode', 'description_html')
+        read_only_fields = fields
+
+
+class BraindumpBundleCardSerializer(BraindumpCardSerializer):
+    class Meta(BraindumpCardSerializer.Meta):
+        fields = BraindumpCardSerializer.Meta.fields + ('postpone_until', 'last_interaction')
+        read_only_fields = fields
+
+
+class BraindumpSyncSerializer(serializers.Serializer):
+    reviews = BraindumpReviewSerializer(many=True)
@@ -0,0 +1,210 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from braindump.exceptions import ReviewQueueLocked
+from braindump.models import CardPlacement, CardPlacementCounter
+from braindump.placements import build_virtual_card_placement, get_unplaced_cards, get_virtual_card_placements, \
+    insert_card_placements, materialize_card_placements
+from braindump.queues import ReviewQueue
+from braindump.selectors import WeightedAreaCardSelector
+from categories.models import Category
+
+
+def select_next_card_placement(user, category_pk, min_area=1, max_area=6):
+    """Selects the next due card placement of a Braindump session (or None if there are no due cards)
+    """
+    if settings.BRAINDUMP_REVIEW_QUEUE_SIZE:
+        try:
+            return ReviewQueue(user, category_pk, min_area, max_area).pop()
+        except ReviewQueueLocked:
+            # Select the card without the review queue:
+            pass
+
+    return WeightedAreaCardSelector().select(
+        CardPlacement.due_objects.all(user, category_pk, min_area, max_area).select_related('card'),
+        get_virtual_card_placements(user, category_pk, min_area),
+    )
+
+
+def get_card_placements(user, card_pk, category_pk=None):
+    """Returns the user's card placements of a card (limited to a category if given)
+    """
+    card_placements = CardPlacement.user_objects.all(user).filter(card_id=card_pk)
+    if category_pk is not None:
+        card_placements = card_placements.filter(category_id=category_pk)
+    return card_placements
+
+
+def set_last_interaction(user, card_pk, category_pk=None):
+    """Sets the time of the last interaction with the user's card placement of a card to now
+
+    Virtual card placements are created before. Cards outside of the category are treated as not found if a category is
+    given.
+    """
+    card_placements = get_card_placements(user, card_pk, category_pk)
+    now = timezone.now()
+
+    if not card_placements.update(last_interaction=now):
+        if not materialize_card_placements(user, [card_pk], category_pk) or \
+                not card_placements.update(last_interaction=now):
+            raise CardPlacement.DoesNotExist()
+
+
+def record_answer(user, card_pk, correct, category_pk=None):
+    """Moves the user's card placement of a card according to the answer and returns its new area
+
+    The card placement is locked while its area, the mode of its category and the time of the last interaction are
+    read, so the new area can be computed from the locked values and written within one single UPDATE statement, and
+    concurrent answers cannot overwrite each other. Virtual card placements are created before. Cards outside of the
+    category are treated as not found if a category is given. The counters are moved along.
+    """
+    card_placements = get_card_placements(user, card_pk, category_pk)
+
+    with transaction.atomic():
+        # The mode is read with a subquery, so only the card placement is locked (and not its category):
+        previous_card_placements = card_placements.select_for_update().annotate(
+            mode=Subquery(Category.objects.filter(pk=OuterRef('category_id')).order_by().values('mode')),
+        ).values_list('category_id', 'area', 'mode')
+        try:
+            category_pk, previous_area, mode = previous_card_placements.get()
+        except CardPlacement.DoesNotExist:
+            if not materialize_card_placements(user, [card_pk], category_pk):
+                raise
+            category_pk, previous_area, mode = previous_card_placements.get()
+
+        if correct:
+            new_area = min(previous_area + 1, 6)
+        elif mode == 1:
+            # Strict mode: Move the card back to the first area:
+            new_area = 1
+        else:
+            # Defensive mode: Move the card back to the previous area:
+            new_area = max(previous_area - 1, 1)
+
+        card_placements.update(area=new_area, last_interaction=timezone.now())
+        CardPlacementCounter.objects.move(user.pk, category_pk, previous_area, new_area)
+        return new_area
+
+
+def postpone_card(user, card_pk, seconds, category_pk=None):
+    """Postpones the user's card placement of a card for the given number of seconds
+
+    Cards outside of the category are treated as not found if a category is given.
+    """
+    card_placements = get_card_placements(user, card_pk, category_pk)
+    now = timezone.now()
+
+    if not card_placements.update(postpone_until=now + timedelta(seconds=seconds), last_interaction=now):
+        if not materialize_card_placements(user, [card_pk], category_pk) or \
+                not card_placements.update(postpone_until=now + timedelta(seconds=seconds), last_interaction=now):
+            raise CardPlacement.DoesNotExist()
+
+    if settings.BRAINDUMP_REVIEW_QUEUE_SIZE:
+        ReviewQueue.invalidate(user, card_placements.values_list('category_id', flat=True).get())
+
+
+def record_reviews(user, reviews, category_pk=None):
+    """Applies a batch of reviews (dicts containing card, result, timestamp and seconds) within one transaction
+
+    Reviews are applied in the order of their client timestamps. A review is skipped if the card placement has been
+    changed at or after its timestamp (this makes resubmissions idempotent), or if another review for the same card
+    and timestamp has already been applied (the first result in the order "nok", "ok", "postpone" wins).
+
+    Reviews for cards outside of the category are treated as not found if a category is given. Virtual card placements
+    are created along with the reviews.
+
+    Reviews with timestamps in the future are rejected. Returns the status of every review ("applied", "duplicate",
+    "stale", "future" or "not_found") in the order of submission.
+    """
+    now = timezone.now()
+    statuses = dict()
+    ordered_reviews = sorted(enumerate(reviews), key=lambda item: (item[1]['timestamp'], item[1]['card'],
+                                                                   item[1]['result']))
+
+    card_pks = set(review['card'] for review in reviews)
+    card_placements = CardPlacement.user_objects.all(user).filter(card_id__in=card_pks)
+    unplaced_cards = get_unplaced_cards(user, card_pks).select_related('category')
+    if category_pk is not None:
+        card_placements = card_placements.filter(category_id=category_pk)
+        unplaced_cards = unplaced_cards.filter(category_id=category_pk)
+
+    with transaction.atomic():
+        card_placements = dict(
+            (card_placement.card_id, card_placement)
+            for card_placement in card_placements.select_related('category').select_for_update()
+        )
+        new_card_placements = list()
+        if settings.BRAINDUMP_LAZY_CARD_PLACEMENTS:
+            for card in unplaced_cards:
+                card_placement = build_virtual_card_placement(card, user)
+                card_placements[card.pk] = card_placement
+                new_card_placements.append(card_placement)
+        changed_card_placements = dict()
+        new_card_placement_indexes = defaultdict(list)
+        counter_deltas = Counter()
+
+        for _, same_reviews in groupby(ordered_reviews, key=lambda item: (item[1]['card'], item[1]['timestamp'])):
+            index, review = next(same_reviews)
+            for duplicate_index, _ in same_reviews:
+                statuses[duplicate_index] = 'duplicate'
+
+            card_placement = card_placements.get(review['card'])
+            if card_placement is None:
+                statuses[index] = 'not_found'
+                continue
+
+            # Client clocks may be ahead, but card placements must not be changed in the future (clamping the
+            # timestamps to the current time would make all further reviews of the card stale):
+            timestamp = review['timestamp']
+            if timestamp > now:
+                statuses[index] = 'future'
+                continue
+            if card_placement.last_interaction is not None and timestamp <= card_placement.last_interaction:
+                statuses[index] = 'stale'
+                continue
+
+            previous_area = card_placement.area
+            apply_review(card_placement, review['result'], timestamp, review.get('seconds', 0))
+            if card_placement.pk is not None:
+                changed_card_placements[card_placement.pk] = card_placement
+                counter_deltas[(user.pk, card_placement.category_id, previous_area)] -= 1
+                counter_deltas[(user.pk, card_placement.category_id, card_placement.area)] += 1
+            else:
+                new_card_placement_indexes[card_placement.card_id].append(index)
+            statuses[index] = 'applied'
+
+        inserted_card_placements = insert_card_placements(new_card_placements)
+        # Card placements which have been created concurrently are left untouched, so their reviews were not applied:
+        inserted_card_pks = set(card_placement.card_id for card_placement in inserted_card_placements)
+        for card_pk, indexes in new_card_placement_indexes.items():
+            if card_pk not in inserted_card_pks:
+                statuses.update((index, 'stale') for index in indexes)
+        CardPlacement.objects.bulk_update(changed_card_placements.values(),
+                                          ['area', 'last_interaction', 'postpone_until'])
+        counter_deltas.update((user.pk, card_placement.category_id, card_placement.area)
+                              for card_placement in inserted_card_placements)
+        CardPlacementCounter.objects.add(counter_deltas)
+
+    return [statuses[index] for index in range(len(reviews))]
+
+
+def apply_review(card_placement, result, timestamp, seconds=0):
+    """Applies a review to a card placement in memory (using the Leitner rules of the card placement's methods)
+    """
+    if result == 'ok':
+        card_placement.move_forward(commit=False)
+    elif result == 'nok':
+        if card_placement.category.mode == 1:
+            card_placement.reset(commit=False)
+        elif card_placement.category.mode == 2:
+            card_placement.move_backward(commit=False)
+    elif result == 'postpone':
+        card_placement.postpone_until = timestamp + timedelta(seconds=seconds)
+
+    card_placement.last_interaction = timestamp
@@ -1,41 +1,132 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
 from django.db.models import signals
 from django.dispatch import receiver
 from django_q.tasks import async_task, async_chain
 
-from braindump.models import CardPlacement
+from braindump.counters import get_card_placement_deltas
+from braindump.forks import copy_forked_cards, get_forked_card_placements
+from braindump.models import CardPlacement, CardPlacementCounter
 from cards.models import Card
-from categories.models import ShareContract
+from categories.models import Category, ShareContract
 from categories.signals import share_contract_accepted, share_contract_revoked
+from categories.versions import bump_category_version
 
 
 @receiver(signals.post_save, sender=Card)
 def create_card_placement_for_new_card(instance, created, **kwargs):
-    """Creates a card placement for a recently created card
+    """Creates card placements for a recently created card
+
+    The card placements of all users the category has been shared with are created using one single bulk insert.
+    If there are more than BRAINDUMP_DEFERRED_FAN_OUT_THRESHOLD users, they are created by the queue workers instead.
+    Shared users don't get any card placements at all if lazy card placements are enabled.
+    """
+    if created and not getattr(instance, 'is_fork_copy', False):
+        user_pks = list()
+        if not settings.BRAINDUMP_LAZY_CARD_PLACEMENTS:
+            user_pks = list(instance.category.share_contracts.filter(accepted=True).values_list('user_id', flat=True))
+        threshold = settings.BRAINDUMP_DEFERRED_FAN_OUT_THRESHOLD
+
+        if threshold and len(user_pks) > threshold:
+            # The queue workers must not see the card before it has been committed:
+            transaction.on_commit(lambda: async_task('braindump.tasks.create_card_placements_for_shared_card',
+                                                     instance))
+            user_pks = list()
+
+        user_pks = [instance.category.owner_id] + user_pks
+        CardPlacement.objects.bulk_create(
+            CardPlacement(card=instance, category_id=instance.category_id, user_id=user_pk) for user_pk in user_pks
+        )
+        CardPlacementCounter.objects.add(dict(((user_pk, instance.category_id, 1), 1) for user_pk in user_pks))
+
+
+@receiver(signals.post_save, sender=Card)
+def update_card_placement_category(instance, created, **kwargs):
+    """Keeps the denormalized category of all card placements in sync if a card has been moved to another category
     """
-    if created:
-        CardPlacement.objects.create(
-            card=instance,
-            user=instance.category.owner,
+    if not created:
+        # The card placements of forks keep pointing to the original card (see braindump.forks):
+        card_placements = CardPlacement.card_objects.all(instance).exclude(category_id=instance.category_id).exclude(
+            category__fork__origin_id=instance.category_id,
         )
+        moved_card_placements = list(card_placements.values_list('user_id', 'category_id', 'area'))
+        if moved_card_placements:
+            card_placements.update(category_id=instance.category_id)
+            for category_pk in set(category_pk for _, category_pk, _ in moved_card_placements):
+                bump_category_version(category_pk)
+
+            deltas = Counter()
+            for user_pk, category_pk, area in moved_card_placements:
+                deltas[(user_pk, category_pk, area)] -= 1
+                deltas[(user_pk, instance.category_id, area)] += 1
+            CardPlacementCounter.objects.add(deltas)
+
+
+@receiver(signals.pre_save, sender=Card)
+def copy_changed_card_for_forks(instance, raw=False, update_fields=None, **kwargs):
+    """Copies a card into all forks of its category before its content or category gets changed (see braindump.forks)
+    """
+    forked_fields = ('question', 'answer', 'hint', 'category_id')
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and not set(update_fields) & set(forked_fields + ('category',)):
+        return
+
+    previous_values = Card.objects.filter(pk=instance.pk).values_list(*forked_fields).first()
+    if previous_values is not None and previous_values != tuple(getattr(instance, field) for field in forked_fields):
+        copy_forked_cards(get_forked_card_placements().filter(card_id=instance.pk))
 
-        for share_contract in instance.category.share_contracts.filter(accepted=True):
-            CardPlacement.objects.create(
-                card=instance,
-                user=share_contract.user,
-            )
+
+@receiver(signals.pre_delete, sender=Card)
+def copy_card_for_forks(instance, **kwargs):
+    """Copies a card into all forks of its category before it gets deleted (see braindump.forks)
+
+    Afterwards, the remaining card placements are removed from the counters before they get deleted along with the
+    card (the card placements of the forks are kept, so this has to happen after the copy).
+    """
+    copy_forked_cards(get_forked_card_placements().filter(card_id=instance.pk))
+    CardPlacementCounter.objects.add(get_card_placement_deltas(CardPlacement.card_objects.all(instance), sign=-1))
+
+
+@receiver(signals.pre_delete, sender=Category)
+def copy_cards_for_forks(instance, **kwargs):
+    """Copies all cards of a category into its forks before it gets deleted (see braindump.forks)
+    """
+    copy_forked_cards(get_forked_card_placements().filter(card__category_id=instance.pk))
+
+
+@receiver(signals.post_save, sender=Card)
+@receiver(signals.post_delete, sender=Card)
+def bump_category_version_for_card(instance, **kwargs):
+    """Invalidates cached content of the category (e.g. review queues) if one of its cards has been changed
+    """
+    bump_category_version(instance.category_id)
+
+
+@receiver(signals.post_save, sender=Category)
+def bump_category_version_for_category(instance, **kwargs):
+    """Invalidates cached content of the category (e.g. tiles of the Braindump index) if it has been changed
+    """
+    bump_category_version(instance.pk)
 
 
 @receiver(share_contract_accepted, sender=ShareContract)
 def share_contract_accepted(share_contract, **kwargs):
     """Signal handler for share contracts that have been accepted
     """
-    async_task('braindump.tasks.create_card_placements_for_shared_category', share_contract)
+    bump_category_version(share_contract.category_id)
+    transaction.on_commit(lambda: async_task('braindump.tasks.create_card_placements_for_shared_category',
+                                             share_contract))
 
 
 @receiver(share_contract_revoked, sender=ShareContract)
 def share_contract_revoked(share_contract, **kwargs):
     """Signal handler for shared contracts that have been deleted
     """
+    bump_category_version(share_contract.category_id)
+
     # Do this only if the share contract was accepted:
     if share_contract.accepted:
         async_chain([
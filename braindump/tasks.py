@@ -1,8 +1,15 @@
 import logging
 
-from braindump.models import CardPlacement
-from cards.models import Card
-from categories.models import Category
+from django.conf import settings
+from django.db.models import Q
+
+from braindump.counters import refresh_card_placement_counters
+from braindump.exceptions import ReviewQueueLocked
+from braindump.forks import copy_forked_cards, fork_category, get_forked_card_placements
+from braindump.models import CardPlacement, CardPlacementCounter
+from braindump.queues import ReviewQueue
+from braindump.utils import iterate_in_chunks
+from categories.versions import bump_category_version
 
 
 logger = logging.getLogger(__name__)
@@ -10,49 +17,67 @@ logger = logging.getLogger(__name__)
 
 def create_card_placements_for_shared_category(share_contract):
     """Creates card placements for a recently accepted share contract
+
+    The card IDs are streamed from the database and the card placements are inserted in chunks, so the memory usage
+    does not depend on the size of the category. Existing card placements are left untouched.
+
+    Original cards of a shared fork, as well as the user's own forks of the shared cards, are copied beforehand. No
+    card placements are created if lazy card placements are enabled.
     """
-    for card in share_contract.category.cards.all():
-        logger.info('Creating card placement for share contract #{}, card #{} and user #{}'.format(
-            share_contract.pk, card.pk, share_contract.user.pk
-        ))
-        CardPlacement.objects.create(
-            card=card,
-            user=share_contract.user,
+    batch_size = settings.BRAINDUMP_CARD_PLACEMENT_BATCH_SIZE
+    category = share_contract.category
+    user = share_contract.user
+
+    copy_forked_cards(get_forked_card_placements().filter(Q(category=category) | Q(user=user, card__category=category)))
+
+    if settings.BRAINDUMP_LAZY_CARD_PLACEMENTS:
+        return
+
+    card_pks = category.cards.order_by('pk').values_list('pk', flat=True).iterator(chunk_size=batch_size)
+
+    logger.info('Creating card placements for share contract #{}, category #{} and user #{}'.format(
+        share_contract.pk, category.pk, user.pk
+    ))
+    processed_cards = 0
+    for card_pk_chunk in iterate_in_chunks(card_pks, batch_size):
+        CardPlacement.objects.bulk_create(
+            (CardPlacement(card_id=card_pk, category=category, user=user) for card_pk in card_pk_chunk),
+            batch_size=batch_size,
+            ignore_conflicts=True,
         )
+        processed_cards += len(card_pk_chunk)
+        logger.debug('Processed {} cards for share contract #{}'.format(processed_cards, share_contract.pk))
+
+    refresh_card_placement_counters(user_id=user.pk, category_id=category.pk)
+    logger.info('Share contract #{} has {} card placements for {} cards'.format(
+        share_contract.pk,
+        CardPlacement.user_objects.all(user).filter(category=category).count(),
+        processed_cards,
+    ))
+
+
+def create_card_placements_for_shared_card(card):
+    """Creates the card placements of all users a recently created card has been shared with
+    """
+    batch_size = settings.BRAINDUMP_CARD_PLACEMENT_BATCH_SIZE
+    user_pks = list(card.category.share_contracts.filter(accepted=True).exclude(
+        user__cardplacement__card=card,
+    ).values_list('user_id', flat=True))
+
+    logger.info('Creating card placements of shared users for card #{}'.format(card.pk))
+    CardPlacement.objects.bulk_create(
+        (CardPlacement(card=card, category_id=card.category_id, user_id=user_pk) for user_pk in user_pks),
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    CardPlacementCounter.objects.add(dict(((user_pk, card.category_id, 1), 1) for user_pk in user_pks))
 
 
 def create_independent_category(share_contract):
-    """Duplicates an existing category with its cards and moves all necessary card placements
+    """Creates a fork of the category for the user of a revoked share contract (see braindump.forks)
     """
-    # Duplicate category:
-    logger.info('Duplicating category #{}'.format(share_contract.category.pk))
-    new_category = Category.objects.get(pk=share_contract.category.pk)
-    new_category.pk = None
-    new_category.owner = share_contract.user
-    new_category.save()
-    logger.debug('New category is #{}'.format(share_contract.category.pk, new_category.pk))
-
-    for card in share_contract.category.cards.all():
-        # Duplicate card:
-        logger.info('Duplicating card #{}'.format(card.pk))
-        new_card = Card.objects.get(pk=card.pk)
-        new_card.pk = None
-        new_card.category = new_category
-        new_card.save()  # this will be creating a new card placement automatically
-        logger.debug('New card is #{}'.format(card.pk, new_card.pk))
-
-        # Remove the auto-generated card placement:
-        automatic_card_placement = CardPlacement.card_user_objects.get(card=new_card, user=share_contract.user)
-        logger.debug('Removing auto-generated card placement #{}'.format(automatic_card_placement.pk))
-        automatic_card_placement.delete()
-
-        # Move existing card placement to the new card:
-        card_placement = CardPlacement.card_user_objects.get(card=card, user=share_contract.user)
-        logger.debug('Moving existing card placement #{} to recently created card #{}'.format(
-            card_placement.pk, new_card.pk
-        ))
-        card_placement.card = new_card
-        card_placement.save()
+    category_fork = fork_category(share_contract)
+    logger.info('Forked category #{} as category #{}'.format(share_contract.category.pk, category_fork.category.pk))
 
 
 def delete_revoked_share_contract(share_contract):
@@ -61,7 +86,23 @@ def delete_revoked_share_contract(share_contract):
     if share_contract.accepted and share_contract.revoked:
         logger.info('Deleting revoked share contract #{}'.format(share_contract.pk))
         share_contract.delete()
+        # The card placements of the former shared user are gone now:
+        bump_category_version(share_contract.category_id)
     else:
         logger.warning('Refuse to delete revoked share contract #{}, because it has not been accepted yet'.format(
             share_contract.pk
         ))
+
+
+def refill_review_queue(user, category_pk, min_area, max_area):
+    """Refills the review queue of a Braindump session
+    """
+    logger.debug('Refilling review queue for category #{}, user #{} and areas {}-{}'.format(
+        category_pk, user.pk, min_area, max_area
+    ))
+    try:
+        ReviewQueue(user, category_pk, min_area, max_area).refill()
+    except ReviewQueueLocked:
+        logger.warning('Skipping the refill of the locked review queue for category #{} and user #{}'.format(
+            category_pk, user.pk
+        ))
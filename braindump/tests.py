@@ -1,22 +1,49 @@
+import json
 import math
+import random
 from datetime import timedelta
+from io import StringIO
 
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
+from braindump.checks import check_index_tile_cache
+from braindump.counters import refresh_card_placement_counters, verify_card_placement_counters
+from braindump.exceptions import ReviewQueueLocked
 from braindump.models import CardPlacement
-from braindump.views import BraindumpViewMixin
+from braindump.placements import VirtualCardPlacements, insert_card_placements
+from braindump.queues import ReviewQueue
+from braindump.sampling import ALIAS_TABLES, sample_area
+from braindump.selectors import RandomKeyCardSelector, RandomOrderCardSelector, WeightedAreaCardSelector
+from braindump.services import record_answer, record_reviews, select_next_card_placement
+from braindump.tasks import create_card_placements_for_shared_category, create_independent_category
+from braindump.views.gui import BraindumpViewMixin
 from cards.models import Card
-from categories.models import Category
+from categories.models import Category, CategoryFork, ShareContract
+
+
+def run_on_commit_callbacks():
+    """Runs the callbacks registered by transaction.on_commit() (test cases never commit their transaction)
+    """
+    while connection.run_on_commit:
+        callbacks, connection.run_on_commit = connection.run_on_commit, list()
+        for _, callback in callbacks:
+            callback()
 
 
 class BraindumpTestCase(TestCase):
     def setUp(self):
         """Set up test scenario
         """
+        cache.clear()
+
         self.test_user = User.objects.create_user('test')
         self.test_category = Category.objects.create(name='Category 1', description='Description 1',
                                                      owner=self.test_user)
@@ -53,6 +80,66 @@ class BraindumpTestCase(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
+    def test_index_summary(self):
+        """Test if the braindump index runs a constant number of queries and annotates the categories
+        """
+        url = reverse('braindump-index')
+        shared_test_category = Category.objects.create(name='Category 2', description='Description 2',
+                                                       owner=self.test_user)
+        ShareContract.objects.create(category=shared_test_category, user=self.foreign_test_user, accepted=True)
+        ShareContract.objects.create(category=self.foreign_test_category, user=self.test_user)
+        self._create_test_card()
+        _, postponed_test_card_placement = self._create_test_card(category=shared_test_category)
+        postponed_test_card_placement.postpone_until = timezone.now() + timedelta(hours=1)
+        postponed_test_card_placement.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        category_list = list(response.context['category_list'])
+        self.assertEqual([(category.card_count, category.due_card_count, category.is_shared)
+                          for category in category_list], [(1, 1, False), (1, 0, True)])
+
+        for i in range(3):
+            category = Category.objects.create(name='Category {}'.format(i + 3), description='Description',
+                                               owner=self.test_user)
+            self._create_test_card(category=category)
+        with self.assertNumQueries(len(queries)):
+            self.client.get(url)
+
+    @override_settings(BRAINDUMP_INDEX_TILE_CACHE_TIMEOUT=3600)
+    def test_index_tile_cache(self):
+        """Test if the cached category tiles of the braindump index follow the changes of categories and cards
+        """
+        url = reverse('braindump-index')
+        # The local memory cache of the tests does not see the changes of other processes:
+        self.assertEqual([warning.id for warning in check_index_tile_cache(None)], ['braindump.W001'])
+        ShareContract.objects.create(category=self.test_category, user=self.foreign_test_user, accepted=True)
+        self._create_test_card()
+        self.assertContains(self.client.get(url), '1 card (1 due)')
+        self.assertContains(self.client.get(url), 'shared,')
+        self.assertContains(self.foreign_client.get(url), 'shared by test')
+
+        self.test_category.description = 'Changed description'
+        self.test_category.save()
+        self._create_test_card()
+        response = self.client.get(url)
+        self.assertContains(response, 'Changed description')
+        self.assertContains(response, '2 cards (2 due)')
+
+        CardPlacement.objects.filter(user=self.test_user).update(postpone_until=timezone.now() + timedelta(hours=1))
+        self.assertContains(self.client.get(url), '2 cards (0 due)')
+        self.assertContains(self.foreign_client.get(url), '2 cards (2 due)')
+
+        # Forked cards are counted by their card placements (without changing the version of the category):
+        foreign_test_card, _ = self._create_test_card(category=self.foreign_test_category, user=self.foreign_test_user)
+        forked_card_placement = CardPlacement.objects.create(card=foreign_test_card, category=self.test_category,
+                                                             user=self.test_user,
+                                                             postpone_until=timezone.now() + timedelta(hours=1))
+        self.assertContains(self.client.get(url), '3 cards (0 due)')
+        forked_card_placement.delete()
+        self.assertContains(self.client.get(url), '2 cards (0 due)')
+
     def test_session(self):
         """Test if the braindump session starts successfully
         """
@@ -167,6 +254,427 @@ class BraindumpTestCase(TestCase):
 
         refreshed_test_card_placement = CardPlacement.card_user_objects.get(card=test_card, user=self.test_user)
         self.assertEqual(refreshed_test_card_placement.postpone_until, test_card_placement.postpone_until)
+        self.assertGreater(refreshed_test_card_placement.last_interaction, test_card_placement.last_interaction)
+
+        foreign_response = self.foreign_client.get(url)
+        self.assertEqual(foreign_response.status_code, 404)
+
+    def test_ok_foreign_card(self):
+        """Test if the "OK" button in braindump fails if the user has no card placement for the card
+        """
+        test_card, test_card_placement = self._create_test_card(category=self.foreign_test_category,
+                                                                user=self.foreign_test_user)
+        url = reverse('braindump-ok', args=(test_card.category.pk, test_card.pk))
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+        refreshed_test_card_placement = CardPlacement.objects.get(pk=test_card_placement.pk)
+        self.assertEqual(refreshed_test_card_placement.area, 1)
+
+    def test_record_answer(self):
+        """Test if answers are recorded according to the mode of the category and return the new area
+        """
+        defensive_test_category = Category.objects.create(name='Category 1337', description='Description 1337',
+                                                          mode=2, owner=self.test_user)
+        strict_test_card, strict_test_card_placement = self._create_test_card()
+        defensive_test_card, defensive_test_card_placement = self._create_test_card(category=defensive_test_category)
+
+        for test_card in (strict_test_card, defensive_test_card):
+            for area in range(2, 7):
+                self.assertEqual(record_answer(self.test_user, test_card.pk, correct=True), area)
+            self.assertEqual(record_answer(self.test_user, test_card.pk, correct=True), 6)
+
+        self.assertEqual(record_answer(self.test_user, strict_test_card.pk, correct=False), 1)
+        self.assertEqual(record_answer(self.test_user, defensive_test_card.pk, correct=False), 5)
+
+        refreshed_test_card_placement = CardPlacement.objects.get(pk=defensive_test_card_placement.pk)
+        self.assertGreater(refreshed_test_card_placement.last_interaction,
+                           defensive_test_card_placement.last_interaction)
+
+        with self.assertRaises(CardPlacement.DoesNotExist):
+            record_answer(self.foreign_test_user, strict_test_card.pk, correct=True)
+
+        with CaptureQueriesContext(connection) as context:
+            record_answer(self.test_user, defensive_test_card.pk, correct=True)
+        card_placement_selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "braindump_cardplacement"' in query['sql']
+        ]
+        self.assertEqual(len(card_placement_selects), 1)
+
+    def test_api_next_card(self):
+        """Test if the braindump API selects the next card including its rendered markdown
+        """
+        test_card, test_card_placement = self._create_test_card()
+        url = reverse('api-braindump-next-card', args=('v1', test_card.category.pk))
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['next_card']['card'], test_card.pk)
+        self.assertEqual(response.data['next_card']['area'], 1)
+        self.assertEqual(response.data['next_card']['question_html'], '<p>Question</p>\n')
+
+        response = self.client.get(url, {'min_area': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['next_card'])
+
+        response = self.client.get(url, {'min_area': 4, 'max_area': 3})
+        self.assertEqual(response.status_code, 400)
+
+        foreign_response = self.foreign_client.get(url)
+        self.assertEqual(foreign_response.status_code, 404)
+
+    def test_api_answer(self):
+        """Test if the braindump API records answers and returns the next card
+        """
+        test_card, test_card_placement = self._create_test_card()
+        url = reverse('api-braindump-answer', args=('v1', test_card.category.pk))
+
+        response = self.client.post(url, {'card': test_card.pk, 'result': 'ok'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['area'], 2)
+        self.assertEqual(response.data['next_card']['card'], test_card.pk)
+
+        response = self.client.post(url, {'card': test_card.pk, 'result': 'nok'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['area'], 1)
+
+        response = self.client.post(url, {'card': test_card.pk, 'result': 'postpone', 'seconds': 900})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['next_card'])
+        refreshed_test_card_placement = CardPlacement.card_user_objects.get(card=test_card, user=self.test_user)
+        self.assertGreater(refreshed_test_card_placement.postpone_until, timezone.now())
+
+        response = self.client.post(url, {'card': test_card.pk, 'result': 'postpone',
+                                          'seconds': settings.BRAINDUMP_MAX_POSTPONE_SECONDS + 1})
+        self.assertEqual(response.status_code, 400)
+
+        # The card has to belong to the category of the session:
+        other_test_category = Category.objects.create(name='Category 2', description='Description 2',
+                                                      owner=self.test_user)
+        url = reverse('api-braindump-answer', args=('v1', other_test_category.pk))
+        for result in ('ok', 'postpone'):
+            response = self.client.post(url, {'card': test_card.pk, 'result': result})
+            self.assertEqual(response.status_code, 404)
+
+    def test_api_reviews(self):
+        """Test if a batch of reviews is applied in the order of the client timestamps
+        """
+        # JSON timestamps are rounded to milliseconds:
+        timestamp = timezone.now().replace(microsecond=0)
+        test_card, test_card_placement = self._create_test_card()
+        test_card_placement.set_last_interaction(timestamp - timedelta(hours=1))
+        foreign_test_card, foreign_test_card_placement = self._create_test_card(category=self.foreign_test_category,
+                                                                                user=self.foreign_test_user)
+        url = reverse('api-braindump-reviews', args=('v1',))
+        reviews = [
+            {'card': test_card.pk, 'result': 'ok', 'timestamp': timestamp - timedelta(seconds=10)},
+            {'card': test_card.pk, 'result': 'ok', 'timestamp': timestamp - timedelta(seconds=30)},
+            {'card': test_card.pk, 'result': 'nok', 'timestamp': timestamp - timedelta(seconds=20)},
+            {'card': test_card.pk, 'result': 'ok', 'timestamp': timestamp - timedelta(seconds=20)},
+            {'card': foreign_test_card.pk, 'result': 'ok', 'timestamp': timestamp},
+        ]
+
+        response = self.client.post(url, reviews, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['applied', 'applied', 'applied', 'duplicate', 'not_found'])
+
+        # ok (area 2), nok (strict mode, area 1), ok (area 2):
+        refreshed_test_card_placement = CardPlacement.card_user_objects.get(card=test_card, user=self.test_user)
+        self.assertEqual(refreshed_test_card_placement.area, 2)
+        self.assertEqual(refreshed_test_card_placement.last_interaction, timestamp - timedelta(seconds=10))
+
+        # Resubmissions are ignored:
+        response = self.client.post(url, reviews, content_type='application/json')
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['stale', 'stale', 'stale', 'duplicate', 'not_found'])
+        refreshed_test_card_placement = CardPlacement.card_user_objects.get(card=test_card, user=self.test_user)
+        self.assertEqual(refreshed_test_card_placement.area, 2)
+
+        # Reviews from the future are rejected without blocking the following ones:
+        future_reviews = [
+            {'card': test_card.pk, 'result': 'ok', 'timestamp': timestamp + timedelta(hours=1)},
+            {'card': test_card.pk, 'result': 'ok', 'timestamp': timestamp + timedelta(hours=2)},
+        ]
+        response = self.client.post(url, future_reviews, content_type='application/json')
+        self.assertEqual([result['status'] for result in response.data['results']], ['future', 'future'])
+        response = self.client.post(url, [{'card': test_card.pk, 'result': 'ok', 'timestamp': timestamp}],
+                                    content_type='application/json')
+        self.assertEqual([result['status'] for result in response.data['results']], ['applied'])
+
+    @override_settings(BRAINDUMP_MAX_REVIEWS_PER_REQUEST=2)
+    def test_api_reviews_limit(self):
+        """Test if oversized batches of reviews are rejected before the reviews are validated
+        """
+        test_card, _ = self._create_test_card()
+        review = {'card': test_card.pk, 'result': 'ok', 'timestamp': timezone.now()}
+        # Invalid reviews are not validated at all:
+        reviews = [review, review, {'card': 'invalid'}]
+
+        url = reverse('api-braindump-reviews', args=('v1',))
+        response = self.client.post(url, reviews, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, ['Cannot record more than 2 reviews at once.'])
+
+        url = reverse('api-braindump-sync', args=('v1', self.test_category.pk))
+        response = self.client.post(url, {'reviews': reviews}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, ['Cannot record more than 2 reviews at once.'])
+        self.assertFalse(CardPlacement.objects.filter(card=test_card, area=2).exists())
+
+    def test_api_bundle(self):
+        """Test if a category is streamed including the user's card placements
+        """
+        test_card, test_card_placement = self._create_test_card()
+        test_card_placement.move_forward()
+        self._create_test_card(category=self.foreign_test_category, user=self.foreign_test_user)
+        url = reverse('api-braindump-bundle', args=('v1', self.test_category.pk))
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        bundle = json.loads(b''.join(response.streaming_content).decode())
+        self.assertEqual(bundle['category']['id'], self.test_category.pk)
+        self.assertEqual(len(bundle['cards']), 1)
+        self.assertEqual(bundle['cards'][0]['card'], test_card.pk)
+        self.assertEqual(bundle['cards'][0]['area'], 2)
+        self.assertIn('<p>Question</p>', bundle['cards'][0]['question_html'])
+
+        url = reverse('api-braindump-bundle', args=('v1', self.foreign_test_category.pk))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_api_sync(self):
+        """Test if offline reviews of a category are replayed idempotently
+        """
+        timestamp = timezone.now().replace(microsecond=0)
+        test_card, test_card_placement = self._create_test_card()
+        test_card_placement.set_last_interaction(timestamp - timedelta(hours=1))
+        other_category = Category.objects.create(name='Category 2', description='Description 2', owner=self.test_user)
+        other_test_card, other_test_card_placement = self._create_test_card(category=other_category)
+        other_test_card_placement.set_last_interaction(timestamp - timedelta(hours=1))
+        url = reverse('api-braindump-sync', args=('v1', self.test_category.pk))
+        reviews = {
+            'reviews': [
+                {'card': test_card.pk, 'result': 'ok', 'timestamp': timestamp - timedelta(seconds=20)},
+                {'card': test_card.pk, 'result': 'ok', 'timestamp': timestamp - timedelta(seconds=10)},
+                {'card': other_test_card.pk, 'result': 'ok', 'timestamp': timestamp},
+            ],
+        }
+
+        response = self.client.post(url, reviews, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['applied', 'applied', 'not_found'])
+        self.assertEqual([card['area'] for card in response.data['cards']], [3])
+
+        # Retried uploads are ignored:
+        response = self.client.post(url, reviews, content_type='application/json')
+        self.assertEqual([result['status'] for result in response.data['results']],
+                         ['stale', 'stale', 'not_found'])
+        refreshed_test_card_placement = CardPlacement.card_user_objects.get(card=test_card, user=self.test_user)
+        self.assertEqual(refreshed_test_card_placement.area, 3)
+        refreshed_other_test_card_placement = CardPlacement.card_user_objects.get(card=other_test_card,
+                                                                                  user=self.test_user)
+        self.assertEqual(refreshed_other_test_card_placement.area, 1)
+
+    @override_settings(BRAINDUMP_CARD_PLACEMENT_BATCH_SIZE=2)
+    def test_create_card_placements_for_shared_category(self):
+        """Test if card placements are created in chunks without touching existing card placements
+        """
+        test_cards = [self._create_test_card(suffix=i)[0] for i in range(5)]
+        existing_card_placement = CardPlacement.objects.create(card=test_cards[0], category=self.test_category,
+                                                               user=self.foreign_test_user, area=3)
+        share_contract = ShareContract(category=self.test_category, user=self.foreign_test_user)
+
+        create_card_placements_for_shared_category(share_contract)
+
+        card_placements = CardPlacement.user_objects.all(self.foreign_test_user).filter(category=self.test_category)
+        self.assertEqual(set(card_placements.values_list('card', flat=True)), set(card.pk for card in test_cards))
+        self.assertEqual(card_placements.get(pk=existing_card_placement.pk).area, 3)
+
+    @override_settings(BRAINDUMP_CARD_PLACEMENT_BATCH_SIZE=2)
+    def test_category_fork(self):
+        """Test if revoked categories are forked and cards are copied only if they are changed or deleted
+        """
+        test_cards = [self._create_test_card(suffix=i)[0] for i in range(5)]
+        share_contract = ShareContract.objects.create(category=self.test_category, user=self.foreign_test_user)
+        share_contract.accept()
+        run_on_commit_callbacks()
+        for area, test_card in enumerate(test_cards, start=1):
+            CardPlacement.objects.filter(card=test_card, user=self.foreign_test_user).update(area=area)
+        refresh_card_placement_counters()
+
+        create_independent_category(share_contract)
+
+        fork_category = CategoryFork.objects.get(origin=self.test_category).category
+        self.assertEqual(fork_category.owner, self.foreign_test_user)
+        card_placements = CardPlacement.user_objects.all(self.foreign_test_user).filter(category=fork_category)
+        self.assertEqual(set(card_placements.values_list('card', flat=True)), set(card.pk for card in test_cards))
+        self.assertFalse(fork_category.cards.exists())
+        self.assertEqual(fork_category.count_cards(), 5)
+
+        # Saving an unchanged card does not copy it:
+        test_cards[3].save()
+        self.assertFalse(fork_category.cards.exists())
+
+        # The owner changes an original card:
+        test_cards[0].question = 'Updated question'
+        test_cards[0].save()
+        self.assertEqual(card_placements.get(area=1).card.question, 'Question')
+        self.assertEqual(card_placements.get(area=1).card.category, fork_category)
+
+        # The user changes an original card:
+        url = reverse('card-update', args=(test_cards[1].pk,))
+        self.foreign_client.post(url, {'question': 'Forked question', 'hint': '', 'answer': 'Answer'})
+        self.assertEqual(Card.objects.get(pk=test_cards[1].pk).question, 'Question')
+        self.assertEqual(card_placements.get(area=2).card.question, 'Forked question')
+
+        # The user deletes an original card:
+        url = reverse('card-delete', args=(test_cards[2].pk,))
+        self.foreign_client.post(url)
+        self.assertTrue(Card.objects.filter(pk=test_cards[2].pk).exists())
+
+        # The owner deletes the original category:
+        self.test_category.delete()
+        self.assertEqual(list(card_placements.order_by('area').values_list('area', flat=True)), [1, 2, 4, 5])
+        self.assertEqual(fork_category.cards.count(), 4)
+        self.assertEqual(verify_card_placement_counters(), {})
+
+    def test_create_card_placements_for_new_card(self):
+        """Test if new cards are placed for the owner and every user who accepted a share contract
+        """
+        accepted_test_users = [User.objects.create_user('braindump subscriber {}'.format(i)) for i in range(2)]
+        for user in accepted_test_users:
+            ShareContract.objects.create(category=self.test_category, user=user, accepted=True)
+        ShareContract.objects.create(category=self.test_category, user=self.foreign_test_user)
+
+        for threshold in (0, 1):
+            with self.settings(BRAINDUMP_DEFERRED_FAN_OUT_THRESHOLD=threshold):
+                test_card, _ = self._create_test_card()
+            self.assertEqual(CardPlacement.card_objects.all(test_card).count(), 3 - 2 * threshold)
+            run_on_commit_callbacks()
+            self.assertEqual(
+                set(CardPlacement.card_objects.all(test_card).values_list('user', flat=True)),
+                set(user.pk for user in [self.test_user] + accepted_test_users),
+            )
+
+    @override_settings(BRAINDUMP_LAZY_CARD_PLACEMENTS=True)
+    def test_lazy_card_placements(self):
+        """Test if missing card placements of shared users are treated as area 1 and created on the first interaction
+        """
+        share_contract = ShareContract.objects.create(category=self.test_category, user=self.foreign_test_user)
+        share_contract.accept()
+        test_card, _ = self._create_test_card()
+        other_test_card, _ = self._create_test_card()
+        foreign_card_placements = CardPlacement.user_objects.all(self.foreign_test_user)
+        self.assertFalse(foreign_card_placements.exists())
+
+        url = reverse('braindump-session', args=(self.test_category.pk,))
+        response = self.foreign_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['card_placement'].pk)
+        self.assertEqual(response.context['card_placement'].area, 1)
+        review_queue = ReviewQueue(self.foreign_test_user, self.test_category.pk)
+        self.assertEqual(set(review_queue.draw(10)), {test_card.pk, other_test_card.pk})
+
+        url = reverse('braindump-ok', args=(self.test_category.pk, test_card.pk))
+        self.foreign_client.get(url)
+        self.assertEqual(foreign_card_placements.get(card=test_card).area, 2)
+
+        url = reverse('category-detail', args=(self.test_category.pk,))
+        response = self.foreign_client.get(url)
+        self.assertEqual(len(response.context['card_placements']), 2)
+        self.assertEqual([response.context['area{}'.format(i)] for i in range(1, 7)], [1, 1, 0, 0, 0, 0])
+
+        url = reverse('api-braindump-sync', args=('v1', self.test_category.pk))
+        review = {'card': other_test_card.pk, 'result': 'ok', 'timestamp': timezone.now().replace(microsecond=0)}
+        response = self.foreign_client.post(url, {'reviews': [review]}, content_type='application/json')
+        self.assertEqual(response.data['results'][0]['status'], 'applied')
+        self.assertEqual(foreign_card_placements.get(card=other_test_card).area, 2)
+        self.assertEqual(verify_card_placement_counters(), {})
+
+        # Foreign cards are not placed:
+        foreign_test_card, _ = self._create_test_card(category=self.foreign_test_category, user=self.foreign_test_user)
+        response = self.client.get(reverse('card-set-area', args=(foreign_test_card.pk, 3)))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(BRAINDUMP_LAZY_CARD_PLACEMENTS=True)
+    def test_virtual_card_placement_selection(self):
+        """Test if random virtual card placements are selected using a constant number of index lookups
+        """
+        share_contract = ShareContract.objects.create(category=self.test_category, user=self.foreign_test_user)
+        share_contract.accept()
+        test_cards = [self._create_test_card(suffix=i)[0] for i in range(5)]
+        virtual_card_placements = VirtualCardPlacements(self.foreign_test_user, self.test_category.pk)
+
+        selections = set()
+        for _ in range(100):
+            with CaptureQueriesContext(connection) as queries:
+                selections.add(virtual_card_placements.select().card_id)
+            self.assertLessEqual(len(queries), 3)
+            self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(selections, set(test_card.pk for test_card in test_cards))
+        self.assertIsNone(virtual_card_placements.exclude(selections).select())
+
+    def test_insert_card_placements(self):
+        """Test if only the card placements which have actually been inserted are returned (and counted)
+        """
+        test_card, test_card_placement = self._create_test_card()
+        other_test_card, other_test_card_placement = self._create_test_card()
+        other_test_card_placement.delete()
+
+        # The card placement of the first card has been created concurrently:
+        card_placements = [CardPlacement(card=card, category=card.category, user=self.test_user)
+                           for card in (test_card, other_test_card)]
+        inserted_card_placements = insert_card_placements(card_placements)
+        self.assertEqual([card_placement.card_id for card_placement in inserted_card_placements], [other_test_card.pk])
+        self.assertEqual(CardPlacement.card_objects.all(test_card).get(), test_card_placement)
+
+    def test_card_placement_counters(self):
+        """Test if the card placement counters are maintained by every code path moving card placements
+        """
+        share_contract = ShareContract.objects.create(category=self.test_category, user=self.foreign_test_user)
+        test_card, test_card_placement = self._create_test_card()
+        other_test_card, _ = self._create_test_card()
+        share_contract.accept()
+        run_on_commit_callbacks()
+        self._create_test_card()
+        self.assertEqual(verify_card_placement_counters(), {})
+
+        test_card_placement.move_forward()
+        test_card_placement.move_forward()
+        test_card_placement.move_backward()
+        record_answer(self.foreign_test_user, test_card.pk, correct=True)
+        self.assertEqual(verify_card_placement_counters(), {})
+
+        self.client.get(reverse('card-set-area', args=(other_test_card.pk, 5)))
+        self.client.get(reverse('card-reset', args=(test_card.pk,)))
+        record_reviews(self.test_user, [
+            {'card': other_test_card.pk, 'result': 'nok', 'timestamp': timezone.now()},
+        ])
+        self.assertEqual(verify_card_placement_counters(), {})
+
+        test_card.category = self.foreign_test_category
+        test_card.save()
+        other_test_card.delete()
+        self.assertEqual(verify_card_placement_counters(), {})
+
+        url = reverse('category-detail', args=(self.test_category.pk,))
+        response = self.client.get(url)
+        self.assertEqual([response.context['area{}'.format(i)] for i in range(1, 7)], [1, 0, 0, 0, 0, 0])
+
+    def test_rebuild_card_placement_counters(self):
+        """Test if the card placement counters can be verified and rebuilt
+        """
+        self._create_test_card()
+        CardPlacement.objects.update(area=3)
+
+        with self.assertRaises(CommandError):
+            call_command('rebuild_card_placement_counters', '--verify-only', stdout=StringIO())
+        call_command('rebuild_card_placement_counters', stdout=StringIO())
+        self.assertEqual(verify_card_placement_counters(), {})
 
     def test_validate_min_max_area_default(self):
         """Test if the default min_area and max_area query string attributes can be validated properly
@@ -227,6 +735,159 @@ class BraindumpTestCase(TestCase):
             # Allow relative tolerance of 20 %:
             self.assertTrue(math.isclose(probability, share, rel_tol=0.2))
 
+    def test_sample_area_distribution(self):
+        """Test if the alias table sampler matches the 1/2^k weighting for all combinations of areas (chi-squared test)
+        """
+        # Critical values of the chi-squared distribution (p = 0.001) by degrees of freedom:
+        critical_values = {1: 10.828, 2: 13.816, 3: 16.266, 4: 18.467, 5: 20.515}
+        cycles = 4000
+        random.seed(1337)
+
+        for (min_area, max_area, mask), alias_table in ALIAS_TABLES.items():
+            # Check every area range without empty areas and every non-empty area mask for the full range:
+            if mask != 0b111111 and (min_area, max_area) != (1, 6):
+                continue
+
+            eligible_areas = [area for area in range(min_area, max_area + 1) if mask & (1 << (area - 1))]
+            self.assertEqual(list(alias_table.outcomes), eligible_areas)
+
+            occurrences = dict((area, 0) for area in eligible_areas)
+            for _ in range(cycles):
+                occurrences[sample_area(min_area, max_area, eligible_areas)] += 1
+
+            total_weight = sum(1 / 2 ** area for area in eligible_areas)
+            chi_squared = 0
+            for area in eligible_areas:
+                expected = cycles * (1 / 2 ** area) / total_weight
+                chi_squared += (occurrences[area] - expected) ** 2 / expected
+
+            if len(eligible_areas) > 1:
+                self.assertLess(chi_squared, critical_values[len(eligible_areas) - 1])
+
+    def test_random_order_card_selector(self):
+        """Test if the random order card selector picks a card of the queryset
+        """
+        test_card, test_card_placement = self._create_test_card()
+        card_placements = CardPlacement.user_objects.all(self.test_user)
+        self.assertEqual(RandomOrderCardSelector().select(card_placements), test_card_placement)
+        self.assertIsNone(RandomOrderCardSelector().select(card_placements.filter(area=2)))
+
+    def test_random_key_card_selector(self):
+        """Test if the random key card selector picks every card of the queryset (including the wrap around)
+        """
+        test_card_placements = set()
+        for random_key in (0.1, 0.5, 0.9):
+            test_card, test_card_placement = self._create_test_card()
+            test_card_placement.random_key = random_key
+            test_card_placement.save()
+            test_card_placements.add(test_card_placement)
+
+        card_placements = CardPlacement.user_objects.all(self.test_user)
+        selections = set(RandomKeyCardSelector().select(card_placements) for _ in range(100))
+        self.assertEqual(selections, test_card_placements)
+        self.assertIsNone(RandomKeyCardSelector().select(card_placements.filter(area=2)))
+
+    @override_settings(BRAINDUMP_CARD_SELECTOR='braindump.selectors.RandomOrderCardSelector')
+    def test_weighted_area_card_selector(self):
+        """Test if the weighted area card selector needs two queries and ignores empty areas
+        """
+        postponed_test_card, postponed_test_card_placement = self._create_test_card()
+        postponed_test_card_placement.postpone_until = timezone.now() + timedelta(
+            seconds=settings.BRAINDUMP_MAX_POSTPONE_SECONDS
+        )
+        postponed_test_card_placement.save()
+
+        test_card, test_card_placement = self._create_test_card()
+        test_card_placement.area = 6
+        test_card_placement.save()
+
+        card_placements = CardPlacement.user_objects.all(self.test_user).filter(postpone_until__lte=timezone.now())
+        for _ in range(10):
+            with self.assertNumQueries(2):
+                card_placement = WeightedAreaCardSelector().select(card_placements)
+            self.assertEqual(card_placement.area, 6)
+
+        with self.assertNumQueries(1):
+            self.assertIsNone(WeightedAreaCardSelector().select(card_placements.filter(area=3)))
+
+    @override_settings(BRAINDUMP_REVIEW_QUEUE_SIZE=10)
+    def test_session_with_review_queue(self):
+        """Test if the braindump session starts successfully using the review queue
+        """
+        test_card, test_card_placement = self._create_test_card()
+        url = reverse('braindump-session', args=(test_card.category.pk,))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['card_placement'], test_card_placement)
+
+    @override_settings(BRAINDUMP_REVIEW_QUEUE_SIZE=10)
+    def test_review_queue(self):
+        """Test if the review queue contains all due cards and skips cards which are not due anymore
+        """
+        test_card_placements = [self._create_test_card()[1] for _ in range(3)]
+        review_queue = ReviewQueue(self.test_user, self.test_category.pk)
+        review_queue.refill()
+        queue = cache.get(review_queue.get_cache_key())
+        self.assertEqual(set(queue), set(card_placement.card_id for card_placement in test_card_placements))
+
+        # Postpone the first card of the queue (without invalidating the queue):
+        postponed_card_placement = CardPlacement.card_user_objects.get(card=queue[0], user=self.test_user)
+        postponed_card_placement.postpone_until = timezone.now() + timedelta(
+            seconds=settings.BRAINDUMP_MAX_POSTPONE_SECONDS
+        )
+        postponed_card_placement.save()
+        self.assertEqual(review_queue.pop().card_id, queue[1])
+
+    @override_settings(BRAINDUMP_REVIEW_QUEUE_SIZE=3, BRAINDUMP_REVIEW_QUEUE_REFILL_THRESHOLD=0)
+    def test_review_queue_concurrency(self):
+        """Test if concurrent pops never get the same card and refills keep the remaining entries of the queue
+        """
+        test_cards = [self._create_test_card()[0] for _ in range(4)]
+        review_queue = ReviewQueue(self.test_user, self.test_category.pk)
+        other_review_queue = ReviewQueue(self.test_user, self.test_category.pk)
+        review_queue.refill()
+        queue = cache.get(review_queue.get_cache_key())
+        self.assertEqual(len(queue), 3)
+
+        self.assertEqual(review_queue.pop().card_id, queue[0])
+        self.assertEqual(other_review_queue.pop().card_id, queue[1])
+        review_queue.refill()
+        refilled_queue = cache.get(review_queue.get_cache_key())
+        self.assertEqual(refilled_queue[0], queue[2])
+        self.assertEqual(len(refilled_queue), 3)
+        self.assertTrue(set(refilled_queue) <= set(test_card.pk for test_card in test_cards))
+        self.assertFalse(cache.get('{}:lock'.format(review_queue.get_cache_key())))
+
+    @override_settings(BRAINDUMP_REVIEW_QUEUE_SIZE=10, BRAINDUMP_REVIEW_QUEUE_LOCK_TIMEOUT=0.1)
+    def test_review_queue_lock_timeout(self):
+        """Test if cards are selected without the review queue if its lock cannot be acquired in time
+        """
+        test_card, _ = self._create_test_card()
+        review_queue = ReviewQueue(self.test_user, self.test_category.pk)
+        cache.set('{}:lock'.format(review_queue.get_cache_key()), True, timeout=60)
+
+        with self.assertRaises(ReviewQueueLocked):
+            review_queue.refill()
+        self.assertEqual(select_next_card_placement(self.test_user, self.test_category.pk).card_id, test_card.pk)
+        self.assertIsNone(cache.get(review_queue.get_cache_key()))
+
+    @override_settings(BRAINDUMP_REVIEW_QUEUE_SIZE=10)
+    def test_review_queue_invalidation(self):
+        """Test if the review queue is invalidated when a card of the category has been changed
+        """
+        test_card, test_card_placement = self._create_test_card()
+        review_queue = ReviewQueue(self.test_user, self.test_category.pk)
+        review_queue.refill()
+        self.assertEqual(cache.get(review_queue.get_cache_key()), [test_card.pk])
+
+        test_card.question = 'Updated question'
+        test_card.save()
+        self.assertIsNone(cache.get(review_queue.get_cache_key()))
+
+        review_queue.refill()
+        ReviewQueue.invalidate(self.test_user, self.test_category.pk)
+        self.assertIsNone(cache.get(review_queue.get_cache_key()))
+
     def test_in_area_1(self):
         """Test if the new card is in area 1
         """
@@ -0,0 +1,22 @@
+from django.conf.urls import url
+
+from braindump.views.api import APIBraindumpAnswer, APIBraindumpBundle, APIBraindumpNextCard, APIBraindumpReviews, \
+    APIBraindumpSync
+
+urlpatterns = [
+    url(r'^categories/(?P<category_pk>[0-9]+)/next/$',
+        APIBraindumpNextCard.as_view(),
+        name='api-braindump-next-card'),
+    url(r'^categories/(?P<category_pk>[0-9]+)/answers/$',
+        APIBraindumpAnswer.as_view(),
+        name='api-braindump-answer'),
+    url(r'^categories/(?P<category_pk>[0-9]+)/bundle/$',
+        APIBraindumpBundle.as_view(),
+        name='api-braindump-bundle'),
+    url(r'^categories/(?P<category_pk>[0-9]+)/sync/$',
+        APIBraindumpSync.as_view(),
+        name='api-braindump-sync'),
+    url(r'^reviews/$',
+        APIBraindumpReviews.as_view(),
+        name='api-braindump-reviews'),
+]
@@ -1,6 +1,6 @@
 from django.conf.urls import url
 
-from braindump.views import BraindumpSession, BraindumpOK, BraindumpNOK, BraindumpIndex, BraindumpPostpone, \
+from braindump.views.gui import BraindumpSession, BraindumpOK, BraindumpNOK, BraindumpIndex, BraindumpPostpone, \
     CardReset, CardExpedite, CardSetArea
 
 urlpatterns = [
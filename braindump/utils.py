@@ -0,0 +1,11 @@
+from itertools import islice
+
+
+def iterate_in_chunks(iterable, chunk_size):
+    """Yields lists of up to chunk_size items of an iterable
+    """
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
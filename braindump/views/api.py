@@ -0,0 +1,187 @@
+import json
+from itertools import chain
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from braindump.models import CardPlacement
+from braindump.placements import get_virtual_card_placements
+from braindump.serializers import BraindumpAnswerSerializer, BraindumpAreaRangeSerializer, \
+    BraindumpBundleCardSerializer, BraindumpBundleCategorySerializer, BraindumpCardSerializer, \
+    BraindumpReviewSerializer, BraindumpSyncSerializer
+from braindump.services import postpone_card, record_answer, record_reviews, select_next_card_placement
+from categories.models import Category
+
+
+class BraindumpAPIMixin:
+    """Mixin for Braindump API views
+    """
+    def check_category(self, category_pk):
+        """Make sure that the category belongs to the authorized user
+        """
+        return get_object_or_404(Category.accessible_objects.all(self.request.user), pk=category_pk)
+
+    def check_number_of_reviews(self, reviews):
+        """Make sure that the number of reviews does not exceed the configured limit
+
+        This is checked before the reviews are validated, so oversized batches are rejected without validating (and
+        looking up) every single review.
+        """
+        if isinstance(reviews, list) and len(reviews) > settings.BRAINDUMP_MAX_REVIEWS_PER_REQUEST:
+            raise ValidationError('Cannot record more than {} reviews at once.'.format(
+                settings.BRAINDUMP_MAX_REVIEWS_PER_REQUEST
+            ))
+
+    def get_review_results(self, reviews, statuses):
+        """Build the response entries of recorded reviews
+        """
+        return [
+            {
+                'card': review['card'],
+                'timestamp': review['timestamp'],
+                'status': status,
+            }
+            for review, status in zip(reviews, statuses)
+        ]
+
+    def get_next_card(self, category_pk):
+        """Select the next card for the area range given in the query string
+        """
+        serializer = BraindumpAreaRangeSerializer(data=self.request.query_params)
+        serializer.is_valid(raise_exception=True)
+        card_placement = select_next_card_placement(self.request.user, category_pk, **serializer.validated_data)
+
+        if not card_placement:
+            return None
+
+        return BraindumpCardSerializer(card_placement).data
+
+
+class APIBraindumpNextCard(BraindumpAPIMixin, APIView):
+    """Select the next card of a Braindump session
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, category_pk, **kwargs):
+        self.check_category(category_pk)
+        return Response({
+            'next_card': self.get_next_card(category_pk),
+        })
+
+
+class APIBraindumpAnswer(BraindumpAPIMixin, APIView):
+    """Record the answer for a card and select the next card of a Braindump session
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, category_pk, **kwargs):
+        self.check_category(category_pk)
+        serializer = BraindumpAnswerSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        card_pk = serializer.validated_data['card']
+        result = serializer.validated_data['result']
+        area = None
+
+        try:
+            if result == 'postpone':
+                postpone_card(request.user, card_pk, serializer.validated_data['seconds'], category_pk=category_pk)
+            else:
+                area = record_answer(request.user, card_pk, correct=result == 'ok', category_pk=category_pk)
+        except CardPlacement.DoesNotExist:
+            raise NotFound()
+
+        return Response({
+            'card': card_pk,
+            'result': result,
+            'area': area,
+            'next_card': self.get_next_card(category_pk),
+        })
+
+
+class APIBraindumpReviews(BraindumpAPIMixin, APIView):
+    """Record a batch of reviews (e.g. buffered by the client) within one transaction
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, **kwargs):
+        self.check_number_of_reviews(request.data)
+        serializer = BraindumpReviewSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        statuses = record_reviews(request.user, serializer.validated_data)
+
+        return Response({
+            'results': self.get_review_results(serializer.validated_data, statuses),
+        })
+
+
+class APIBraindumpBundle(BraindumpAPIMixin, APIView):
+    """Stream a whole category including the rendered cards and the user's card placements for offline use
+    """
+    permission_classes = (IsAuthenticated,)
+    chunk_size = 500
+
+    def get(self, request, category_pk, **kwargs):
+        category = self.check_category(category_pk)
+        card_placements = CardPlacement.user_objects.all(request.user).filter(
+            category=category,
+        ).select_related('card').order_by('pk')
+
+        response = StreamingHttpResponse(self.stream_bundle(category, card_placements),
+                                         content_type='application/json')
+        response['Content-Disposition'] = 'attachment; filename="category-{}.json"'.format(category.pk)
+        return response
+
+    def stream_bundle(self, category, card_placements):
+        """Yield the bundle as JSON, one card at a time
+        """
+        yield '{{"category":{},"generated":{},"cards":['.format(
+            self.dump(BraindumpBundleCategorySerializer(category).data),
+            self.dump(timezone.now()),
+        )
+
+        virtual_card_placements = get_virtual_card_placements(self.request.user, category.pk)
+        if virtual_card_placements is not None:
+            card_placements = chain(card_placements.iterator(chunk_size=self.chunk_size), virtual_card_placements)
+        else:
+            card_placements = card_placements.iterator(chunk_size=self.chunk_size)
+
+        for index, card_placement in enumerate(card_placements):
+            yield (',' if index else '') + self.dump(BraindumpBundleCardSerializer(card_placement).data)
+
+        yield ']}'
+
+    def dump(self, data):
+        return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+class APIBraindumpSync(BraindumpAPIMixin, APIView):
+    """Replay the reviews recorded offline for a category
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, category_pk, **kwargs):
+        self.check_category(category_pk)
+        if isinstance(request.data, dict):
+            self.check_number_of_reviews(request.data.get('reviews'))
+        serializer = BraindumpSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        reviews = serializer.validated_data['reviews']
+
+        statuses = record_reviews(request.user, reviews, category_pk=category_pk)
+        card_placements = CardPlacement.user_objects.all(request.user).filter(
+            category_id=category_pk,
+            card_id__in=set(review['card'] for review in reviews),
+        ).select_related('card')
+
+        return Response({
+            'results': self.get_review_results(reviews, statuses),
+            'cards': BraindumpBundleCardSerializer(card_placements, many=True).data,
+        })
@@ -1,16 +1,22 @@
-from datetime import timedelta
-
-import numpy
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import Http404
+from django.db.models import Exists, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.shortcuts import render, redirect, reverse, get_object_or_404
 from django.utils import timezone
 from django.utils.safestring import mark_safe
 from django.views.generic import TemplateView, View, RedirectView
 
-from braindump.models import CardPlacement
+from braindump.forks import count_by_category, get_card_count
+from braindump.models import CardPlacement, CardPlacementCounter
+from braindump.placements import materialize_card_placements
+from braindump.sampling import sample_area
+from braindump.services import postpone_card, record_answer, select_next_card_placement, set_last_interaction
 from categories.models import Category, ShareContract
+from categories.permissions import get_accessible_categories
+from categories.versions import get_category_versions
 
 
 class BraindumpViewMixin:
@@ -60,22 +66,21 @@ class BraindumpViewMixin:
 
         return '&'.join('{}={}'.format(key, value) for key, value in query_string.items())
 
+    def get_card_placement(self, card_pk):
+        """Get the card placement of a card (it gets created if it has been virtual before)
+        """
+        card_placement_list = CardPlacement.user_objects.all(self.request.user).select_related('card')
+        try:
+            return card_placement_list.get(card_id=card_pk)
+        except CardPlacement.DoesNotExist:
+            if not materialize_card_placements(self.request.user, [card_pk]):
+                raise Http404()
+            return card_placement_list.get(card_id=card_pk)
+
     def get_probability_weighted_area(self, min_area=1, max_area=6):
         """Generate a random area by probability
         """
-        # Generate range of selected areas:
-        area_range = numpy.arange(min_area, max_area + 1)
-
-        # Generate probability:
-        area_probability = list()
-        for _ in range(len(area_range)):
-            area_probability.append(1 / 2 ** _)
-
-        # Normalization of the probability:
-        area_probability = numpy.array(area_probability)
-        area_probability /= area_probability.sum()
-
-        return numpy.random.choice(area_range, 1, p=area_probability)[0]
+        return sample_area(min_area, max_area)
 
 
 class BraindumpIndex(LoginRequiredMixin, TemplateView):
@@ -84,19 +89,54 @@ class BraindumpIndex(LoginRequiredMixin, TemplateView):
     template_name = 'braindump/braindump_index.html'
 
     def get_context_data(self):
-        share_contract_requests = ShareContract.user_objects.all(self.request.user).filter(accepted=False)
-
-        owned_category_list = Category.owned_objects.all(self.request.user)
-        shared_category_list = Category.shared_objects.all(self.request.user)
-        category_list = owned_category_list | shared_category_list
+        share_contract_requests = ShareContract.user_objects.all(self.request.user).filter(
+            accepted=False,
+        ).select_related('category__owner').annotate(
+            card_count=get_card_count(OuterRef('category'), OuterRef('category__owner')),
+        )
 
         context = {
             'share_contract_requests': share_contract_requests,
-            'category_list': category_list,
+            'category_list': self.get_category_tiles(),
+            'tile_cache_timeout': settings.BRAINDUMP_INDEX_TILE_CACHE_TIMEOUT,
         }
 
         return context
 
+    def get_category_tiles(self):
+        """Get the category list along with the keys of the cached tiles (version of the category and role of the user)
+        """
+        category_list = list(self.get_category_list())
+        if not settings.BRAINDUMP_INDEX_TILE_CACHE_TIMEOUT:
+            return category_list
+        versions = get_category_versions(category.pk for category in category_list)
+        roles = get_accessible_categories(self.request.user)
+        for category in category_list:
+            category.version = versions[category.pk]
+            category.role = roles[category.pk]
+        return category_list
+
+    def get_category_list(self):
+        """Get all categories of the authorized user annotated with their card counts and sharing status
+        """
+        user = self.request.user
+        card_count = get_card_count(OuterRef('pk'), OuterRef('owner'))
+        card_placements = CardPlacement.user_objects.all(user).filter(category=OuterRef('pk'))
+        due_card_count = count_by_category(card_placements.filter(postpone_until__lte=timezone.now()))
+
+        if settings.BRAINDUMP_LAZY_CARD_PLACEMENTS:
+            # Cards which have not been placed for the user yet are due:
+            counters = CardPlacementCounter.objects.filter(user=user, category=OuterRef('pk')).order_by().values(
+                'category',
+            ).annotate(total=Sum('count')).values('total')
+            due_card_count = due_card_count + card_count - Coalesce(Subquery(counters, output_field=IntegerField()), 0)
+
+        return Category.accessible_objects.all(user).select_related('owner').annotate(
+            card_count=card_count,
+            due_card_count=due_card_count,
+            is_shared=Exists(ShareContract.objects.filter(category=OuterRef('pk'), accepted=True)),
+        )
+
 
 class BraindumpSession(LoginRequiredMixin, View, BraindumpViewMixin):
     """Run a Braindump session for all cards in a certain category
@@ -104,62 +144,25 @@ class BraindumpSession(LoginRequiredMixin, View, BraindumpViewMixin):
     http_method_names = ['get']
 
     def get(self, request, category_pk):
-        owned_category_list = Category.owned_objects.all(self.request.user)
-        shared_category_list = Category.shared_objects.all(self.request.user)
-        category_list = owned_category_list | shared_category_list
-        get_object_or_404(category_list, pk=category_pk)
+        get_object_or_404(Category.accessible_objects.all(self.request.user), pk=category_pk)
         query_string = self.handle_query_string(request)
 
-        # Maybe a better choice: https://eli.thegreenplace.net/2010/01/22/weighted-random-generation-in-python/
-
         min_area, max_area = self.validate_min_max_area(request)
 
-        # Correct min/max area for getting only options with actually existing cards
-        # (this does not exclude areas *between* min_area and max_area!):
-        card_placement_filter = CardPlacement.user_objects.all(self.request.user).filter(
-            card__category_id=category_pk,
-            area__gte=min_area,
-            area__lte=max_area,
-            postpone_until__lte=timezone.now(),
-        ).order_by('area')
-
-        if card_placement_filter.exists():
-            adjusted_min_area = card_placement_filter.first().area
-            adjusted_max_area = card_placement_filter.last().area
-
-            # If no card matches the selected area, retry:
-            card_placement = False
-            retries = 0
-            while not card_placement and retries < 10:
-                # Select an area:
-                randomly_selected_area = self.get_probability_weighted_area(adjusted_min_area, adjusted_max_area)
-
-                # Query a random card of the selected area (order_by('?') returns *one* random Card object):
-                card_placement = CardPlacement.user_objects.all(self.request.user).filter(
-                    card__category_id=category_pk,
-                    area=randomly_selected_area,
-                    postpone_until__lte=timezone.now(),
-                ).order_by('?').first()
-
-                retries += 1
-
-            if card_placement:
-                # Render a Braindump session containing the selected card:
-                context = {
-                    'card': card_placement.card,
-                    'card_placement': card_placement,
-                    'braindump_ok_query_string': query_string,
-                    'braindump_nok_query_string': query_string,
-                    'braindump_try_again_query_string': query_string,
-                }
-
-                return render(request, 'braindump/braindump_session.html', context)
-            else:
-                card_error = True
-        else:
-            card_error = True
+        card_placement = select_next_card_placement(self.request.user, category_pk, min_area, max_area)
 
-        if card_error:
+        if card_placement:
+            # Render a Braindump session containing the selected card:
+            context = {
+                'card': card_placement.card,
+                'card_placement': card_placement,
+                'braindump_ok_query_string': query_string,
+                'braindump_nok_query_string': query_string,
+                'braindump_try_again_query_string': query_string,
+            }
+
+            return render(request, 'braindump/braindump_session.html', context)
+        else:
             messages.warning(
                 request,
                 'I cannot find any cards for this category in the desired areas. '
@@ -175,9 +178,10 @@ class BraindumpOK(LoginRequiredMixin, RedirectView, BraindumpViewMixin):
     permanent = False
 
     def get_redirect_url(self, card_pk, category_pk):
-        card_placement = get_object_or_404(CardPlacement.user_objects.all(self.request.user), card_id=card_pk)
-        card_placement.move_forward()
-        card_placement.set_last_interaction()
+        try:
+            record_answer(self.request.user, card_pk, correct=True, category_pk=category_pk)
+        except CardPlacement.DoesNotExist:
+            raise Http404()
 
         query_string = self.handle_query_string(self.request)
 
@@ -190,14 +194,10 @@ class BraindumpNOK(LoginRequiredMixin, RedirectView, BraindumpViewMixin):
     permanent = False
 
     def get_redirect_url(self, card_pk, category_pk):
-        card_placement = get_object_or_404(CardPlacement.user_objects.all(self.request.user), card_id=card_pk)
-
-        if card_placement.card.category.mode == 1:
-            card_placement.reset()
-        elif card_placement.card.category.mode == 2:
-            card_placement.move_backward()
-
-        card_placement.set_last_interaction()
+        try:
+            record_answer(self.request.user, card_pk, correct=False, category_pk=category_pk)
+        except CardPlacement.DoesNotExist:
+            raise Http404()
 
         query_string = self.handle_query_string(self.request)
 
@@ -210,19 +210,22 @@ class BraindumpPostpone(LoginRequiredMixin, RedirectView, BraindumpViewMixin):
     permanent = False
 
     def get_redirect_url(self, card_pk, category_pk, seconds):
-        card_placement = get_object_or_404(CardPlacement.user_objects.all(self.request.user), card_id=card_pk)
-
         if int(seconds) > settings.BRAINDUMP_MAX_POSTPONE_SECONDS:
+            try:
+                set_last_interaction(self.request.user, card_pk, category_pk=category_pk)
+            except CardPlacement.DoesNotExist:
+                raise Http404()
             messages.error(
                 self.request,
                 'Cannot postpone a card for more than {} seconds.'.format(settings.BRAINDUMP_MAX_POSTPONE_SECONDS)
             )
         else:
-            card_placement.postpone_until = timezone.now() + timedelta(seconds=int(seconds))
+            try:
+                postpone_card(self.request.user, card_pk, int(seconds), category_pk=category_pk)
+            except CardPlacement.DoesNotExist:
+                raise Http404()
             messages.info(self.request, 'Ok, I will not show the card for 15 minutes from now.')
 
-        card_placement.set_last_interaction()
-
         query_string = self.handle_query_string(self.request)
 
         return '{}{}'.format(reverse('braindump-session', args=(category_pk,)), query_string)
@@ -234,7 +237,7 @@ class CardExpedite(LoginRequiredMixin, RedirectView, BraindumpViewMixin):
     permanent = False
 
     def get_redirect_url(self, card_pk):
-        card_placement = get_object_or_404(CardPlacement.user_objects.all(self.request.user), card_id=card_pk)
+        card_placement = self.get_card_placement(card_pk)
         card_placement.expedite()
         messages.success(
             self.request,
@@ -252,7 +255,7 @@ class CardReset(LoginRequiredMixin, RedirectView, BraindumpViewMixin):
     permanent = False
 
     def get_redirect_url(self, card_pk):
-        card_placement = get_object_or_404(CardPlacement.user_objects.all(self.request.user), card_id=card_pk)
+        card_placement = self.get_card_placement(card_pk)
         prev_area = card_placement.area
 
         if prev_area != 1:
@@ -275,7 +278,7 @@ class CardSetArea(LoginRequiredMixin, RedirectView, BraindumpViewMixin):
     permanent = False
 
     def get_redirect_url(self, card_pk, area):
-        card_placement = get_object_or_404(CardPlacement.user_objects.all(self.request.user), card_id=card_pk)
+        card_placement = self.get_card_placement(card_pk)
         prev_area = card_placement.area
         card_placement.area = area
         card_placement.save()
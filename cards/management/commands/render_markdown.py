@@ -0,0 +1,30 @@
+from django.core.management import BaseCommand
+from django.db.models import Q
+
+from cards.models import Card
+from categories.models import Category
+from memodrop.rendering import render_queryset_markdown
+
+
+class Command(BaseCommand):
+    help = 'Renders the Markdown of cards and categories whose HTML is missing (e.g. after bulk inserts)'
+
+    def add_arguments(self, parser):
+        """Argument handle
+        """
+        parser.add_argument('--all', help='Render all cards and categories (e.g. after changing the Markdown style)',
+                            action='store_true')
+
+    def handle(self, *args, **options):
+        """Command handle
+        """
+        for model in (Card, Category):
+            queryset = model.objects.all()
+            if not options['all']:
+                missing_html = Q()
+                for field in model.markdown_fields:
+                    missing_html |= Q(**{'{}_html'.format(field): ''}) & ~Q(**{field: ''})
+                queryset = queryset.filter(missing_html)
+
+            count = render_queryset_markdown(queryset)
+            self.stdout.write('Rendered {} {}'.format(count, model._meta.verbose_name_plural))
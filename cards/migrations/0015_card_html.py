@@ -0,0 +1,53 @@
+# Generated by Django 2.2.28 on 2026-10-18 07:03
+
+from django.db import migrations, models
+from markdown_deux import markdown
+
+
+def render_markdown(text):
+    """Renders Markdown like memodrop.rendering at the time of this migration (which may change later)
+    """
+    return markdown(text, 'default') if text else ''
+
+
+def render_card_html(apps, schema_editor):
+    """Renders the Markdown of the existing cards
+    """
+    Card = apps.get_model('cards', 'Card')
+    instances = list()
+
+    for instance in Card.objects.order_by('pk').iterator():
+        instance.question_html = render_markdown(instance.question)
+        instance.answer_html = render_markdown(instance.answer)
+        instance.hint_html = render_markdown(instance.hint)
+        instances.append(instance)
+        if len(instances) == 500:
+            Card.objects.bulk_update(instances, ['question_html', 'answer_html', 'hint_html'])
+            instances = list()
+    Card.objects.bulk_update(instances, ['question_html', 'answer_html', 'hint_html'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cards', '0014_auto_20180411_0324'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='card',
+            name='answer_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='hint_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='card',
+            name='question_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(render_card_html, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,10 @@
 from django.db import models
 from django.urls import reverse
 
+from categories.models import CategoryMembership
+from memodrop.rendering import RenderedMarkdownMixin
+from categories.permissions import filter_accessible_category_pks
+
 
 class CardOwnerManager(models.Manager):
     def all(self, user):
@@ -16,18 +20,51 @@ class CardOwnerManager(models.Manager):
 
 class CardSharedManager(models.Manager):
     def all(self, user):
-        """Returns all cards belonging to the category's owner
+        """Returns all cards of categories which have been shared with the user
         """
-        return self.filter(category__share_contracts__user=user, category__share_contracts__accepted=True).all()
+        return self.filter(category__in=filter_accessible_category_pks(user, CategoryMembership.ROLE_SHARED)).all()
 
     def get(self, user, *args, **kwargs):
-        """Returns a card belonging to the category's owner
+        """Returns a card of a category which has been shared with the user
+        """
+        return self.all(user).get(*args, **kwargs)
+
+
+class CardAccessibleManager(models.Manager):
+    def all(self, user):
+        """Returns all cards of categories the user owns or which have been shared with the user
+        """
+        return self.filter(category__in=filter_accessible_category_pks(user)).all()
+
+    def get(self, user, *args, **kwargs):
+        """Returns a card of a category the user owns or which has been shared with the user
+        """
+        return self.all(user).get(*args, **kwargs)
+
+
+class CardForkedManager(models.Manager):
+    def all(self, user):
+        """Returns all original cards of the user's category forks (see categories.models.CategoryFork)
+        """
+        return self.filter(pk__in=self.model.objects.filter(
+            card_placements__user=user,
+            card_placements__category__owner=user,
+        ).exclude(category__owner=user).values('pk')).all()
+
+    def get(self, user, *args, **kwargs):
+        """Returns an original card of the user's category forks
+        """
+        return self.all(user).get(*args, **kwargs)
+
+
+class CardUnplacedManager(models.Manager):
+    def all(self, user):
+        """Returns all cards without a card placement of the user
         """
-        return self.filter(category__share_contracts__user=user, category__share_contracts__accepted=True).get(*args,
-                                                                                                               **kwargs)
+        return self.exclude(card_placements__user=user).all()
 
 
-class Card(models.Model):
+class Card(RenderedMarkdownMixin, models.Model):
     AREA_CHOICES = (
         (1, '1'),
         (2, '2'),
@@ -39,10 +76,17 @@ class Card(models.Model):
     question = models.TextField(verbose_name='Question')
     answer = models.TextField(verbose_name='Answer')
     hint = models.TextField(blank=True, verbose_name='Hint')
+    question_html = models.TextField(blank=True, editable=False)
+    answer_html = models.TextField(blank=True, editable=False)
+    hint_html = models.TextField(blank=True, editable=False)
     category = models.ForeignKey('categories.Category', on_delete=models.CASCADE, related_name='cards')
     objects = models.Manager()
     owned_objects = CardOwnerManager()
     shared_objects = CardSharedManager()
+    accessible_objects = CardAccessibleManager()
+    forked_objects = CardForkedManager()
+    unplaced_objects = CardUnplacedManager()
+    markdown_fields = ('question', 'answer', 'hint')
 
     def __str__(self):
         return 'Card #{}'.format(self.pk)
@@ -53,4 +97,4 @@ class Card(models.Model):
     def is_shared_with(self):
         """Returns a list of users this card is shared with
         """
-        return [s.user for s in self.category.share_contracts.filter(accepted=True)]
+        return self.category.is_shared_with()
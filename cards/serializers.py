@@ -25,3 +25,10 @@ class CardSerializer(serializers.ModelSerializer):
         model = Card
         fields = ('id', 'question', 'answer', 'hint', 'category')
         read_only_fields = ('id',)
+
+    def to_representation(self, card):
+        data = super().to_representation(card)
+        # Original cards of the user's forks belong to the fork (see cards.views.api.APICardForkMixin):
+        if getattr(card, 'fork_category_id', None) is not None:
+            data['category'] = card.fork_category_id
+        return data
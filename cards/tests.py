@@ -1,16 +1,26 @@
+from io import StringIO
+
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from braindump.models import CardPlacement
+from braindump.tasks import create_independent_category
 from cards.models import Card
 from categories.models import Category, ShareContract
+from memodrop.pagination import encode_cursor
 
 
 class CardTestCase(TestCase):
     def setUp(self):
         """Set up test scenario
         """
+        cache.clear()
         self.test_user = User.objects.create_user('test')
         self.test_category = Category.objects.create(name='Category 1', description='Description 1',
                                                      owner=self.test_user)
@@ -39,6 +49,120 @@ class CardTestCase(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
+    def test_list_keyset_pagination(self):
+        """Test if the card list is paginated by area and ID with a constant number of queries per page
+        """
+        for i in range(60):
+            test_card = self._create_test_card()
+            CardPlacement.objects.filter(card=test_card).update(area=i % 6 + 1)
+        url = reverse('card-list')
+
+        card_placement_pks = list()
+        query_counts = list()
+        cursor = None
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {'cursor': cursor} if cursor else {})
+            query_counts.append(len(queries))
+            self.assertFalse(any('COUNT(' in query['sql'] or 'OFFSET' in query['sql']
+                                 for query in queries.captured_queries))
+            card_placement_pks += [card_placement.pk for card_placement in response.context['object_list']]
+            cursor = response.context['page_obj'].next_cursor()
+            if cursor is None:
+                break
+
+        expected_card_placement_pks = list(CardPlacement.user_objects.all(self.test_user).order_by(
+            'area', 'pk',
+        ).values_list('pk', flat=True))
+        self.assertEqual(card_placement_pks, expected_card_placement_pks)
+        self.assertEqual(len(query_counts), 3)
+        self.assertEqual(query_counts[0], query_counts[1])
+
+        # Go back to the first page:
+        previous_cursor = response.context['page_obj'].previous_cursor()
+        response = self.client.get(url, {'cursor': previous_cursor})
+        self.assertEqual([card_placement.pk for card_placement in response.context['object_list']],
+                         expected_card_placement_pks[25:50])
+
+        response = self.client.get(url, {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, 404)
+        for values in ([[1], 2], ['area', 1], [None, 1], [1, {'pk': 1}]):
+            response = self.client.get(url, {'cursor': encode_cursor(values)})
+            self.assertEqual(response.status_code, 404)
+
+    def test_list_queries(self):
+        """Test if the number of queries of the card list does not depend on the number of cards
+        """
+        shared_test_category = Category.objects.create(name='Category 2', description='Description 2',
+                                                       owner=self.foreign_test_user)
+        ShareContract.objects.create(category=shared_test_category, user=self.test_user, accepted=True)
+        self._create_test_card()
+        self._create_test_card(category=shared_test_category)
+        url = reverse('card-list')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(sorted(card_placement.is_shared for card_placement in response.context['object_list']),
+                         [False, True])
+
+        for _ in range(30):
+            self._create_test_card()
+            self._create_test_card(category=shared_test_category)
+        with CaptureQueriesContext(connection) as more_queries:
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['object_list']), 25)
+        self.assertEqual(len(more_queries), len(queries))
+
+    def test_api_list_cursor_pagination(self):
+        """Test if the card API is paginated by cursor
+        """
+        for _ in range(35):
+            self._create_test_card()
+
+        response = self.client.get('/api/v1/cards/')
+        self.assertEqual(len(response.data['results']), 30)
+        self.assertIsNone(response.data['previous'])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(response.data['results'][-1]['id'], Card.objects.order_by('pk').last().pk)
+
+        response = self.client.get('/api/v1/cards/', {'cursor': encode_cursor(['1.5'])})
+        self.assertEqual(response.status_code, 404)
+
+    def test_api_forked_cards(self):
+        """Test if the card API presents the original cards of forks as cards of the fork and copies them on write
+        """
+        test_cards = [self._create_test_card() for _ in range(2)]
+        share_contract = ShareContract.objects.create(category=self.test_category, user=self.foreign_test_user,
+                                                      accepted=True)
+        for test_card in test_cards:
+            CardPlacement.objects.create(card=test_card, category=self.test_category, user=self.foreign_test_user)
+        create_independent_category(share_contract)
+        fork_category = Category.owned_objects.get(self.foreign_test_user)
+        foreign_client = Client()
+        foreign_client.force_login(self.foreign_test_user)
+
+        response = foreign_client.get('/api/v1/cards/')
+        self.assertEqual([(card['id'], card['category']) for card in response.data['results']],
+                         [(test_card.pk, fork_category.pk) for test_card in test_cards])
+        url = '/api/v1/cards/{}/'.format(test_cards[0].pk)
+        self.assertEqual(foreign_client.get(url).status_code, 200)
+
+        response = foreign_client.patch(url, {'question': 'Forked question'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['category'], fork_category.pk)
+        self.assertNotEqual(response.data['id'], test_cards[0].pk)
+        self.assertEqual(Card.objects.get(pk=test_cards[0].pk).question, 'Question')
+
+        response = foreign_client.delete('/api/v1/cards/{}/'.format(test_cards[1].pk))
+        self.assertEqual(response.status_code, 204)
+        self.assertTrue(Card.objects.filter(pk=test_cards[1].pk).exists())
+        self.assertFalse(CardPlacement.objects.filter(card=test_cards[1], user=self.foreign_test_user).exists())
+        self.assertEqual([card['question'] for card in foreign_client.get('/api/v1/cards/').data['results']],
+                         ['Forked question'])
+
     def test_detail(self):
         """Test if the card list is displayed sucessfully
         """
@@ -47,6 +171,24 @@ class CardTestCase(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
+    def test_rendered_markdown(self):
+        """Test if the Markdown of cards is rendered on save and by the backfill command
+        """
+        test_card = Card.objects.create(question='**Question**', answer='Answer', category=self.test_category)
+        self.assertIn('<strong>Question</strong>', test_card.question_html)
+        self.assertEqual(test_card.hint_html, '')
+        test_card.hint = '*Hint*'
+        test_card.save(update_fields=['hint'])
+        self.assertIn('<em>Hint</em>', Card.objects.get(pk=test_card.pk).hint_html)
+
+        Card.objects.filter(pk=test_card.pk).update(question_html='', answer_html='')
+        call_command('render_markdown', stdout=StringIO())
+        refreshed_test_card = Card.objects.get(pk=test_card.pk)
+        self.assertIn('<strong>Question</strong>', refreshed_test_card.question_html)
+        self.assertIn('Answer', refreshed_test_card.answer_html)
+        response = self.client.get(reverse('card-detail', args=(test_card.pk,)))
+        self.assertContains(response, '<strong>Question</strong>')
+
     def test_foreign_card_detail(self):
         """Test if the user has no access to foreign cards
         """
@@ -103,3 +245,13 @@ class CardTestCase(TestCase):
         self.assertEqual([self.foreign_test_user], is_shared_with)
         shared_objects = Card.shared_objects.all(user=self.foreign_test_user)
         self.assertEqual([test_card], list(shared_objects))
+
+    def test_move_card(self):
+        """Test if the denormalized category of the card placements follows a moved card
+        """
+        test_category = Category.objects.create(name='Category', description='Description', owner=self.test_user)
+        test_card = self._create_test_card()
+        test_card.category = test_category
+        test_card.save()
+        card_placement = CardPlacement.card_user_objects.get(card=test_card, user=self.test_user)
+        self.assertEqual(card_placement.category, test_category)
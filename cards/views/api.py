@@ -1,15 +1,52 @@
+from django.db.models import OuterRef, Subquery
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
 
+from braindump.forks import copy_forked_cards, remove_forked_card
+from braindump.models import CardPlacement
+from cards.models import Card
 from cards.serializers import CardSerializer
-from cards.views.gui import CardBelongsOwnerMixin
+from cards.views.gui import CardForkMixin
 
 
-class APICardList(CardBelongsOwnerMixin, generics.ListCreateAPIView):
+class APICardForkMixin(CardForkMixin):
+    """Mixin that returns all cards owned by the authorized user, including the original cards of the user's forks
+
+    Original cards of forks are presented as cards of the fork. Changes are applied to a copy within the fork and
+    deletions remove the card from the fork only, like the GUI does (see braindump.forks).
+    """
+    def get_queryset(self):
+        user = self.request.user
+        fork_categories = CardPlacement.user_objects.all(user).filter(card=OuterRef('pk')).exclude(
+            category_id=OuterRef('category_id'),
+        ).values('category_id')[:1]
+        return (Card.owned_objects.all(user) | Card.forked_objects.all(user)).annotate(
+            fork_category_id=Subquery(fork_categories),
+        )
+
+    def perform_update(self, serializer):
+        forked_card_placement = self.get_forked_card_placement(serializer.instance)
+        if forked_card_placement:
+            # Copy the original card into the fork and update the copy instead:
+            new_card_pks = copy_forked_cards(CardPlacement.objects.filter(pk=forked_card_placement.pk))
+            serializer.instance = Card.objects.get(pk=new_card_pks[forked_card_placement.pk])
+        serializer.save()
+
+    def perform_destroy(self, instance):
+        forked_card_placement = self.get_forked_card_placement(instance)
+        if forked_card_placement:
+            # Remove the original card from the fork only:
+            remove_forked_card(forked_card_placement)
+        else:
+            instance.delete()
+
+
+class APICardList(APICardForkMixin, generics.ListCreateAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = CardSerializer
+    keyset_ordering = ('pk',)
 
 
-class APICardDetail(CardBelongsOwnerMixin, generics.RetrieveUpdateDestroyAPIView):
+class APICardDetail(APICardForkMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = CardSerializer
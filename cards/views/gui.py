@@ -1,5 +1,7 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Exists, OuterRef
 from django.http import HttpResponseRedirect
 from django.urls import reverse_lazy, reverse
 from django.utils.safestring import mark_safe
@@ -7,9 +9,12 @@ from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.views.generic.list import ListView
 
+from braindump.forks import copy_forked_cards, remove_forked_card
 from braindump.models import CardPlacement
+from braindump.placements import build_virtual_card_placement
 from cards.models import Card
-from categories.models import Category
+from categories.models import Category, ShareContract
+from memodrop.pagination import KeysetPaginationMixin
 
 
 class CardBelongsOwnerMixin:
@@ -23,20 +28,38 @@ class CardBelongsUserMixin:
     """Mixin that returns all cards belonging to the authorized user
     """
     def get_queryset(self):
-        owned_card_list = Card.owned_objects.all(self.request.user)
-        shared_card_list = Card.shared_objects.all(self.request.user)
-        return owned_card_list | shared_card_list
+        accessible_card_list = Card.accessible_objects.all(self.request.user)
+        forked_card_list = Card.forked_objects.all(self.request.user)
+        return accessible_card_list | forked_card_list
 
 
-class CardList(LoginRequiredMixin, CardBelongsUserMixin, ListView):
+class CardForkMixin:
+    """Mixin for handling original cards of the authorized user's category forks
+    """
+    def get_forked_card_placement(self, card):
+        """Returns the card placement of the authorized user if the card is an original card of a fork (or None)
+        """
+        return CardPlacement.user_objects.all(self.request.user).filter(card=card).exclude(
+            category_id=card.category_id,
+        ).first()
+
+
+class CardList(LoginRequiredMixin, CardBelongsUserMixin, KeysetPaginationMixin, ListView):
     """List all cards
     """
     paginate_by = 25
-    paginate_orphans = 5
+    keyset_ordering = ('area', 'pk')
     template_name = 'cards/card_list.html'
 
     def get_queryset(self):
-        return CardPlacement.user_objects.all(self.request.user)
+        accepted_share_contracts = ShareContract.objects.filter(
+            category=OuterRef('category'),
+            user=self.request.user,
+            accepted=True,
+        )
+        return CardPlacement.user_objects.all(self.request.user).select_related('card', 'category').annotate(
+            is_shared=Exists(accepted_share_contracts),
+        )
 
 
 class CardDetail(LoginRequiredMixin, CardBelongsUserMixin, DetailView):
@@ -44,7 +67,12 @@ class CardDetail(LoginRequiredMixin, CardBelongsUserMixin, DetailView):
     """
     def get_context_data(self, **kwargs):
         context = super(CardDetail, self).get_context_data(**kwargs)
-        context['card_placement'] = CardPlacement.card_user_objects.get(self.object, self.request.user)
+        try:
+            context['card_placement'] = CardPlacement.card_user_objects.get(self.object, self.request.user)
+        except CardPlacement.DoesNotExist:
+            if not settings.BRAINDUMP_LAZY_CARD_PLACEMENTS:
+                raise
+            context['card_placement'] = build_virtual_card_placement(self.object, self.request.user)
         return context
 
 
@@ -60,8 +88,7 @@ class CardCreate(LoginRequiredMixin, CardBelongsUserMixin, CreateView):
 
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
-        form.fields['category'].queryset = Category.owned_objects.all(self.request.user) | \
-            Category.shared_objects.all(self.request.user)
+        form.fields['category'].queryset = Category.accessible_objects.all(self.request.user)
         return form
 
     def get_initial(self):
@@ -107,7 +134,7 @@ class CardCreate(LoginRequiredMixin, CardBelongsUserMixin, CreateView):
         return resp
 
 
-class CardUpdate(LoginRequiredMixin, CardBelongsUserMixin, UpdateView):
+class CardUpdate(LoginRequiredMixin, CardBelongsUserMixin, CardForkMixin, UpdateView):
     """Update a card
     """
     fields = ['question',
@@ -120,6 +147,13 @@ class CardUpdate(LoginRequiredMixin, CardBelongsUserMixin, UpdateView):
         return form
 
     def form_valid(self, form):
+        forked_card_placement = self.get_forked_card_placement(self.object)
+        if forked_card_placement:
+            # Copy the original card into the fork and update the copy instead:
+            new_card_pks = copy_forked_cards(CardPlacement.objects.filter(pk=forked_card_placement.pk))
+            form.instance.pk = new_card_pks[forked_card_placement.pk]
+            form.instance.category = forked_card_placement.category
+
         if self.request.POST.get('save') == 'Save and Create New':
             card_object = form.save()
 
@@ -156,11 +190,22 @@ class CardUpdate(LoginRequiredMixin, CardBelongsUserMixin, UpdateView):
         return resp
 
 
-class CardDelete(LoginRequiredMixin, CardBelongsOwnerMixin, DeleteView):
+class CardDelete(LoginRequiredMixin, CardBelongsOwnerMixin, CardForkMixin, DeleteView):
     """Delete a card
     """
     success_url = reverse_lazy('card-list')
 
+    def get_queryset(self):
+        return super().get_queryset() | Card.forked_objects.all(self.request.user)
+
     def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        forked_card_placement = self.get_forked_card_placement(self.object)
+        if forked_card_placement:
+            # Remove the original card from the fork only:
+            remove_forked_card(forked_card_placement)
+            messages.success(self.request, 'Card deleted.')
+            return HttpResponseRedirect(self.get_success_url())
+
         messages.success(self.request, 'Card deleted.')
         return super(CardDelete, self).delete(request, *args, **kwargs)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from categories.models import Category, ShareContract
+from categories.models import Category, CategoryFork, CategoryMembership, ShareContract
 
 
 class CategoryAdmin(admin.ModelAdmin):
@@ -16,5 +16,18 @@ class ShareContractAdmin(admin.ModelAdmin):
     readonly_fields = list_display
 
 
+class CategoryForkAdmin(admin.ModelAdmin):
+    list_display = ('category', 'origin', 'created')
+    readonly_fields = list_display
+
+
+class CategoryMembershipAdmin(admin.ModelAdmin):
+    list_display = ('category', 'user', 'role')
+    list_filter = ('role',)
+    readonly_fields = list_display
+
+
 admin.site.register(Category, CategoryAdmin)
+admin.site.register(CategoryFork, CategoryForkAdmin)
+admin.site.register(CategoryMembership, CategoryMembershipAdmin)
 admin.site.register(ShareContract, ShareContractAdmin)
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.dummy.DummyCache',
+    'django.core.cache.backends.locmem.LocMemCache',
+)
+
+
+@register()
+def check_accessible_categories_cache(app_configs, **kwargs):
+    """Checks if the accessible categories are only cached in a cache backend shared by all processes
+    """
+    cache_backend = settings.CACHES['default']['BACKEND']
+    if settings.CATEGORIES_CACHE_ACCESSIBLE_CATEGORIES and cache_backend in LOCAL_CACHE_BACKENDS:
+        return [Error(
+            'CATEGORIES_CACHE_ACCESSIBLE_CATEGORIES requires a shared cache backend.',
+            hint='Configure a shared default cache backend (e.g. Redis or Memcached).',
+            id='categories.E001',
+        )]
+    return []
@@ -0,0 +1,77 @@
+import sys
+
+from django.core.management import BaseCommand
+
+from categories.models import Category, CategoryMembership, ShareContract
+from categories.signals import invalidate_accessible_categories
+
+
+class Command(BaseCommand):
+    help = 'Checks the category memberships against the category owners and accepted share contracts'
+
+    def add_arguments(self, parser):
+        """Argument handle
+        """
+        parser.add_argument('--repair', help='Try to repair inconsistencies', action='store_true')
+
+    def handle(self, *args, **options):
+        """Command handle
+        """
+        expected_memberships = self._get_expected_memberships()
+        memberships = dict(
+            ((user_pk, category_pk), (pk, role))
+            for pk, user_pk, category_pk, role in CategoryMembership.objects.values_list(
+                'pk', 'user_id', 'category_id', 'role',
+            )
+        )
+
+        missing = list()
+        obsolete = list()
+        for key, role in expected_memberships.items():
+            if key not in memberships or memberships[key][1] != role:
+                missing.append((key, role))
+        for key, (pk, role) in memberships.items():
+            if expected_memberships.get(key) != role:
+                obsolete.append(pk)
+
+        for (user_pk, category_pk), role in missing:
+            self.stdout.write(self.style.ERROR('Missing membership of user #{} in category #{} (role {})'.format(
+                user_pk, category_pk, role,
+            )))
+        for pk in obsolete:
+            self.stdout.write(self.style.ERROR('Obsolete membership #{}'.format(pk)))
+
+        if not missing and not obsolete:
+            self.stdout.write(self.style.SUCCESS('All category memberships are consistent'))
+            return
+
+        if options['repair']:
+            obsolete_user_pks = CategoryMembership.objects.filter(pk__in=obsolete).values_list('user_id', flat=True)
+            affected_user_pks = set(obsolete_user_pks) | set(user_pk for (user_pk, _), _ in missing)
+            CategoryMembership.objects.filter(pk__in=obsolete).delete()
+            CategoryMembership.objects.bulk_create(
+                CategoryMembership(user_id=user_pk, category_id=category_pk, role=role)
+                for (user_pk, category_pk), role in missing
+            )
+            # Bulk inserts do not send any signals:
+            for user_pk in affected_user_pks:
+                invalidate_accessible_categories(user_pk)
+            self.stdout.write(self.style.SUCCESS('Deleted {} and created {} memberships'.format(
+                len(obsolete), len(missing),
+            )))
+        else:
+            self.stdout.write('Try to fix the inconsistencies with --repair')
+            sys.exit(1)
+
+    def _get_expected_memberships(self):
+        """Returns the expected role by user and category
+        """
+        expected_memberships = dict(
+            ((owner_pk, category_pk), CategoryMembership.ROLE_OWNER)
+            for category_pk, owner_pk in Category.objects.values_list('pk', 'owner_id')
+        )
+        for category_pk, user_pk in ShareContract.objects.filter(accepted=True, revoked=False).values_list(
+            'category_id', 'user_id',
+        ):
+            expected_memberships.setdefault((user_pk, category_pk), CategoryMembership.ROLE_SHARED)
+        return expected_memberships
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0013_categoryfork'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['owner', 'name', 'id'], name='categories__owner_i_3f0834_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_memberships(apps, schema_editor):
+    """Creates the memberships of all category owners and users of accepted share contracts
+    """
+    Category = apps.get_model('categories', 'Category')
+    CategoryMembership = apps.get_model('categories', 'CategoryMembership')
+    ShareContract = apps.get_model('categories', 'ShareContract')
+
+    CategoryMembership.objects.bulk_create(
+        (
+            CategoryMembership(user_id=owner_pk, category_id=category_pk, role=1)
+            for category_pk, owner_pk in Category.objects.values_list('pk', 'owner_id').iterator()
+        ),
+        batch_size=500,
+    )
+    CategoryMembership.objects.bulk_create(
+        (
+            CategoryMembership(user_id=user_pk, category_id=category_pk, role=2)
+            for category_pk, user_pk in ShareContract.objects.filter(accepted=True, revoked=False).values_list(
+                'category_id', 'user_id',
+            ).iterator()
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('categories', '0014_category_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryMembership',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.IntegerField(choices=[(1, 'Owner'), (2, 'Shared')])),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='categories.Category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_memberships', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'category')},
+            },
+        ),
+        migrations.RunPython(create_memberships, migrations.RunPython.noop),
+    ]
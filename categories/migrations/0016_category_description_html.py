@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-18 07:03
+
+from django.db import migrations, models
+from markdown_deux import markdown
+
+
+def render_markdown(text):
+    """Renders Markdown like memodrop.rendering at the time of this migration (which may change later)
+    """
+    return markdown(text, 'default') if text else ''
+
+
+def render_category_description_html(apps, schema_editor):
+    """Renders the Markdown of the existing categories
+    """
+    Category = apps.get_model('categories', 'Category')
+    instances = list()
+
+    for instance in Category.objects.order_by('pk').iterator():
+        instance.description_html = render_markdown(instance.description)
+        instances.append(instance)
+        if len(instances) == 500:
+            Category.objects.bulk_update(instances, ['description_html'])
+            instances = list()
+    Category.objects.bulk_update(instances, ['description_html'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('categories', '0015_categorymembership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='description_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(render_category_description_html, migrations.RunPython.noop),
+    ]
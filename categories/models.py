@@ -1,10 +1,12 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 
 from categories.exceptions import ShareContractAlreadyRevoked, ShareContractCannotBeAccepted, \
     ShareContractCannotBeDeclined, ShareContractCannotBeRevoked
+from categories.permissions import filter_accessible_category_pks
 from categories.signals import share_contract_accepted, share_contract_revoked
+from memodrop.rendering import RenderedMarkdownMixin
 
 
 class CategoryOwnerManager(models.Manager):
@@ -23,33 +25,59 @@ class CategorySharedManager(models.Manager):
     def all(self, user):
         """Returns all categories shared with the user
         """
-        return self.filter(share_contracts__user=user, share_contracts__accepted=True).all()
+        return self.filter(pk__in=filter_accessible_category_pks(user, CategoryMembership.ROLE_SHARED)).all()
 
     def get(self, user, *args, **kwargs):
         """Returns a category shared with the user
         """
-        return self.filter(share_contracts__user=user, share_contracts__accepted=True).get(*args, **kwargs)
+        return self.all(user).get(*args, **kwargs)
 
 
-class Category(models.Model):
+class CategoryAccessibleManager(models.Manager):
+    def all(self, user):
+        """Returns all categories the user owns or which have been shared with the user (see categories.permissions)
+        """
+        return self.filter(pk__in=filter_accessible_category_pks(user)).all()
+
+    def get(self, user, *args, **kwargs):
+        """Returns a category the user owns or which has been shared with the user
+        """
+        return self.all(user).get(*args, **kwargs)
+
+
+class Category(RenderedMarkdownMixin, models.Model):
     MODE_CHOICES = (
         (1, 'Strict'),
         (2, 'Defensive'),
     )
     name = models.CharField(max_length=128)
     description = models.TextField(verbose_name='Description')
+    description_html = models.TextField(blank=True, editable=False)
     mode = models.IntegerField(default=1, choices=MODE_CHOICES)
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     objects = models.Manager()
     owned_objects = CategoryOwnerManager()
     shared_objects = CategorySharedManager()
+    accessible_objects = CategoryAccessibleManager()
+    markdown_fields = ('description',)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['owner', 'name', 'id']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        created = self.pk is None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if created:
+                CategoryMembership.objects.create(user_id=self.owner_id, category=self,
+                                                  role=CategoryMembership.ROLE_OWNER)
+
     def get_absolute_url(self):
         """Get the absolute URL to a single card
         """
@@ -61,9 +89,51 @@ class Category(models.Model):
         return self.cards.filter(area=area)
 
     def is_shared_with(self):
-        """Returns a list of users this category is shared with
+        """Returns a list of users this category is shared with (memoized, since templates ask several times)
         """
-        return [s.user for s in self.share_contracts.filter(accepted=True)]
+        if not hasattr(self, '_shared_with'):
+            self._shared_with = [s.user for s in self.share_contracts.filter(accepted=True).select_related('user')]
+        return self._shared_with
+
+    def count_cards(self):
+        """Returns the number of cards (including the original cards of a fork which have not been copied yet)
+        """
+        forked_card_count = self.card_placements.filter(user_id=self.owner_id).exclude(
+            card__category_id=self.pk,
+        ).count()
+        return self.cards.count() + forked_card_count
+
+
+class CategoryMembership(models.Model):
+    """Denormalized access of a user to a category, either as its owner or by an accepted share contract
+
+    Memberships are maintained by Category.save() and ShareContract.save()/delete(), so all categories a user can see
+    are found using one single indexed lookup.
+    """
+    ROLE_OWNER = 1
+    ROLE_SHARED = 2
+    ROLE_CHOICES = (
+        (ROLE_OWNER, 'Owner'),
+        (ROLE_SHARED, 'Shared'),
+    )
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='category_memberships')
+    category = models.ForeignKey('categories.Category', on_delete=models.CASCADE, related_name='memberships')
+    role = models.IntegerField(choices=ROLE_CHOICES)
+
+    class Meta:
+        unique_together = (('user', 'category'),)
+
+
+class CategoryFork(models.Model):
+    """Copy-on-write fork of a category, created for the user of a revoked share contract
+
+    The fork does not contain copies of the original cards. Instead, the card placements of the user keep pointing to
+    the original cards, while their category is the fork. A card gets copied into the fork as soon as it is changed in
+    one of both categories or deleted from the original category (see braindump.forks).
+    """
+    category = models.OneToOneField('categories.Category', on_delete=models.CASCADE, related_name='fork')
+    origin = models.ForeignKey('categories.Category', on_delete=models.SET_NULL, null=True, related_name='forks')
+    created = models.DateTimeField(auto_now_add=True)
 
 
 class ShareContractUserManager(models.Manager):
@@ -131,6 +201,24 @@ class ShareContract(models.Model):
     class Meta:
         unique_together = (('category', 'user'),)
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            memberships = CategoryMembership.objects.filter(user_id=self.user_id, category_id=self.category_id,
+                                                            role=CategoryMembership.ROLE_SHARED)
+            if self.accepted and not self.revoked:
+                if not memberships.exists():
+                    CategoryMembership.objects.create(user_id=self.user_id, category_id=self.category_id,
+                                                      role=CategoryMembership.ROLE_SHARED)
+            else:
+                memberships.delete()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            CategoryMembership.objects.filter(user_id=self.user_id, category_id=self.category_id,
+                                              role=CategoryMembership.ROLE_SHARED).delete()
+            return super().delete(*args, **kwargs)
+
     def accept(self):
         """Accept this share contract
         """
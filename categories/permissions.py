@@ -0,0 +1,65 @@
+"""Access of users to categories
+
+The categories a user can access (see categories.models.CategoryMembership) are memoized on the user object of the
+request, so they are fetched (and their version is read) only once per request.
+
+If CATEGORIES_CACHE_ACCESSIBLE_CATEGORIES is enabled, they are additionally kept in the Django cache under a per-user
+version, which is increased whenever one of the user's memberships changes, and the managers of categories and cards
+filter by the cached IDs instead of a membership subquery. This requires a cache backend shared by all processes (see
+categories.checks), otherwise the versions are not increased for all processes.
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+from categories.versions import get_category_access_version
+
+
+def _get_accessible_categories_key(user_pk, version):
+    return 'accessible-categories:{}:{}'.format(user_pk, version)
+
+
+def _get_memberships(user, role=None):
+    CategoryMembership = apps.get_model('categories', 'CategoryMembership')
+    memberships = CategoryMembership.objects.filter(user=user)
+    if role is not None:
+        memberships = memberships.filter(role=role)
+    return memberships
+
+
+def get_accessible_categories(user):
+    """Returns the roles of the user by category ID for all categories the user can access
+    """
+    if hasattr(user, '_accessible_categories'):
+        return user._accessible_categories
+
+    if settings.CATEGORIES_CACHE_ACCESSIBLE_CATEGORIES:
+        key = _get_accessible_categories_key(user.pk, get_category_access_version(user.pk))
+        accessible_categories = cache.get(key)
+        if accessible_categories is None:
+            accessible_categories = dict(_get_memberships(user).values_list('category_id', 'role'))
+            cache.set(key, accessible_categories)
+    else:
+        accessible_categories = dict(_get_memberships(user).values_list('category_id', 'role'))
+
+    user._accessible_categories = accessible_categories
+    return accessible_categories
+
+
+def get_accessible_category_pks(user, role=None):
+    """Returns the IDs of all categories the user can access (optionally limited to one role)
+    """
+    return [
+        category_pk for category_pk, category_role in get_accessible_categories(user).items()
+        if role is None or category_role == role
+    ]
+
+
+def filter_accessible_category_pks(user, role=None):
+    """Returns the IDs of all categories the user can access for an "__in" lookup
+
+    These are the cached IDs if CATEGORIES_CACHE_ACCESSIBLE_CATEGORIES is enabled, and a membership subquery otherwise.
+    """
+    if settings.CATEGORIES_CACHE_ACCESSIBLE_CATEGORIES:
+        return get_accessible_category_pks(user, role)
+    return _get_memberships(user, role).values('category')
@@ -1,4 +1,49 @@
-from django.dispatch import Signal
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from categories.versions import bump_category_access_version
 
 share_contract_accepted = Signal(providing_args=['pk'])
 share_contract_revoked = Signal(providing_args=['pk'])
+
+
+def invalidate_accessible_categories(user_pk):
+    """Invalidates the cached accessible categories of a user (see categories.permissions)
+
+    The version is increased again after the transaction has been committed, so concurrent requests cannot keep
+    caching the previous state.
+    """
+    bump_category_access_version(user_pk)
+    transaction.on_commit(lambda: bump_category_access_version(user_pk))
+
+
+@receiver(share_contract_accepted)
+@receiver(share_contract_revoked)
+def invalidate_accessible_categories_for_share_contract(share_contract, **kwargs):
+    """Signal handler for share contracts that have been accepted or revoked
+    """
+    invalidate_accessible_categories(share_contract.user_id)
+
+
+@receiver(post_save, sender='categories.Category')
+def invalidate_accessible_categories_for_category(instance, created, **kwargs):
+    """Signal handler for categories that have been created
+    """
+    if created:
+        invalidate_accessible_categories(instance.owner_id)
+
+
+@receiver(post_delete, sender='categories.Category')
+def invalidate_accessible_categories_for_deleted_category(instance, **kwargs):
+    """Signal handler for categories that have been deleted
+    """
+    invalidate_accessible_categories(instance.owner_id)
+
+
+@receiver(post_save, sender='categories.CategoryMembership')
+@receiver(post_delete, sender='categories.CategoryMembership')
+def invalidate_accessible_categories_for_membership(instance, **kwargs):
+    """Signal handler for memberships that have been created or deleted (e.g. by the consistency check)
+    """
+    invalidate_accessible_categories(instance.user_id)
@@ -1,17 +1,28 @@
+from io import StringIO
+
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
-from django.test import TestCase, Client
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from braindump.counters import refresh_card_placement_counters
 from braindump.models import CardPlacement
+from braindump.tests import run_on_commit_callbacks
 from cards.models import Card
-from categories.models import Category, ShareContract
+from categories.checks import check_accessible_categories_cache
+from categories.models import Category, CategoryMembership, ShareContract
+from categories.permissions import get_accessible_category_pks
 
 
 class CategoryTestCase(TestCase):
     def setUp(self):
         """Set up test scenario
         """
+        cache.clear()
         self.test_user = User.objects.create_user('test')
         self.test_category = Category.objects.create(name='Category 1', description='Description 1',
                                                      owner=self.test_user)
@@ -44,6 +55,33 @@ class CategoryTestCase(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
+    def test_list_queries(self):
+        """Test if the category list counts the cards of all categories with a constant number of queries
+        """
+        self._create_test_card()
+        url = reverse('category-list')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+
+        ShareContract.objects.create(category=self.foreign_test_category, user=self.test_user, accepted=True)
+        # An original card of a fork (see braindump.forks):
+        origin_category = Category.objects.create(name='Origin', description='Description',
+                                                  owner=self.foreign_test_user)
+        CardPlacement.objects.create(card=self._create_test_card(category=origin_category),
+                                     category=self.test_category, user=self.test_user)
+        for i in range(10):
+            category = Category.objects.create(name='Category {}'.format(i + 2), description='Description',
+                                               owner=self.test_user)
+            self._create_test_card(category=category)
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url)
+
+        card_counts = dict((category.pk, category.card_count) for category in response.context['category_list'])
+        self.assertEqual(card_counts[self.test_category.pk], 2)
+        self.assertEqual(card_counts[self.foreign_test_category.pk], 0)
+        self.assertEqual(card_counts[self.test_category.pk], self.test_category.count_cards())
+        self.assertContains(response, '(shared with me)', count=1)
+
     def test_detail(self):
         """Test if the category list is displayed successfully
         """
@@ -52,6 +90,50 @@ class CategoryTestCase(TestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
 
+    def test_detail_pagination(self):
+        """Test if the card table of the category detail view is paginated with a constant number of queries
+        """
+        for _ in range(31):
+            self._create_test_card()
+        CardPlacement.objects.filter(card__category=self.test_category).update(area=2)
+        refresh_card_placement_counters()
+        url = reverse('category-detail', args=(self.test_category.pk,))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.context['area2'], 31)
+        self.assertEqual(len(response.context['card_placements']), 25)
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 2)
+
+        for _ in range(31):
+            self._create_test_card()
+        with CaptureQueriesContext(connection) as more_queries:
+            response = self.client.get(url, {'page': 3})
+        self.assertEqual(len(response.context['card_placements']), 12)
+        self.assertEqual(len(more_queries), len(queries))
+
+    @override_settings(BRAINDUMP_LAZY_CARD_PLACEMENTS=True)
+    def test_detail_pagination_lazy_card_placements(self):
+        """Test if virtual card placements are listed before the card placements of the shared user
+        """
+        for _ in range(40):
+            self._create_test_card()
+        ShareContract.objects.create(category=self.test_category, user=self.foreign_test_user, accepted=True)
+        placed_cards = Card.objects.filter(category=self.test_category).order_by('pk')[:10]
+        CardPlacement.objects.bulk_create(
+            CardPlacement(card=card, category=self.test_category, user=self.foreign_test_user, area=2)
+            for card in placed_cards
+        )
+        refresh_card_placement_counters()
+        url = reverse('category-detail', args=(self.test_category.pk,))
+
+        response = self.foreign_client.get(url, {'page': 2})
+        self.assertEqual(response.context['area1'], 30)
+        self.assertEqual(response.context['area2'], 10)
+        self.assertEqual([card_placement.area for card_placement in response.context['card_placements']],
+                         [1] * 5 + [2] * 10)
+        self.assertTrue(all(card_placement.pk is None for card_placement in response.context['card_placements'][:5]))
+
     def test_foreign_category_detail(self):
         """Test if the user has no access to foreign categories
         """
@@ -140,9 +222,93 @@ class CategoryTestCase(TestCase):
         self.assertEqual(response.status_code, 302)
         refreshed_share_contract = ShareContract.objects.get(pk=share_contract.pk)
         self.assertTrue(refreshed_share_contract.accepted)
+        # The card placements are created as soon as the share contract has been committed:
+        test_card_placement = CardPlacement.objects.filter(card=test_card, user=self.foreign_test_user)
+        self.assertFalse(test_card_placement.exists())
+        run_on_commit_callbacks()
         test_card_placement = CardPlacement.objects.filter(card=test_card, user=self.foreign_test_user)
         self.assertTrue(test_card_placement.exists())
 
+    def test_category_memberships(self):
+        """Test if the category memberships follow the lifecycle of categories and share contracts
+        """
+        test_category = Category.objects.create(name='Category', description='Description', owner=self.test_user)
+        self.assertIn(test_category, Category.accessible_objects.all(self.test_user))
+
+        share_contract = ShareContract.objects.create(user=self.foreign_test_user, category=test_category)
+        self.assertNotIn(test_category, Category.accessible_objects.all(self.foreign_test_user))
+        share_contract.accept()
+        self.assertIn(test_category, Category.accessible_objects.all(self.foreign_test_user))
+        self.assertIn(test_category, Category.shared_objects.all(self.foreign_test_user))
+        share_contract.revoke()
+        self.assertNotIn(test_category, Category.accessible_objects.all(self.foreign_test_user))
+        call_command('check_category_membership_consistency', stdout=StringIO())
+
+        CategoryMembership.objects.filter(category=test_category).delete()
+        with self.assertRaises(SystemExit):
+            call_command('check_category_membership_consistency', stdout=StringIO())
+        call_command('check_category_membership_consistency', '--repair', stdout=StringIO())
+        self.assertIn(test_category, Category.accessible_objects.all(self.test_user))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_category_versions_without_cache(self):
+        """Test if categories and cards can be changed if the cache does not store the versions
+        """
+        test_category = Category.objects.create(name='Category', description='Description', owner=self.test_user)
+        test_category.description = 'Changed description'
+        test_category.save()
+        test_card = Card.objects.create(question='Question', answer='Answer', category=test_category)
+        test_card.delete()
+        share_contract = ShareContract.objects.create(user=self.foreign_test_user, category=test_category)
+        share_contract.accept()
+        test_category.delete()
+        self.assertFalse(Category.objects.filter(pk=test_category.pk).exists())
+
+    @override_settings(CATEGORIES_CACHE_ACCESSIBLE_CATEGORIES=True)
+    def test_accessible_categories_cache(self):
+        """Test if the accessible categories are cached until the memberships of the user change
+        """
+        def get_test_user():
+            # Every request has its own user object:
+            return User.objects.get(pk=self.foreign_test_user.pk)
+
+        test_category = Category.objects.create(name='Category', description='Description', owner=self.test_user)
+        self.assertNotIn(test_category.pk, get_accessible_category_pks(get_test_user()))
+
+        test_user = get_test_user()
+        with CaptureQueriesContext(connection) as queries:
+            get_accessible_category_pks(test_user)
+            Category.accessible_objects.all(test_user).count()
+        self.assertEqual(len(queries), 1)
+
+        share_contract = ShareContract.objects.create(user=self.foreign_test_user, category=test_category)
+        share_contract.accept()
+        self.assertIn(test_category.pk, get_accessible_category_pks(get_test_user()))
+        self.assertIn(test_category.pk, get_accessible_category_pks(get_test_user(), CategoryMembership.ROLE_SHARED))
+        share_contract.revoke()
+        self.assertNotIn(test_category.pk, get_accessible_category_pks(get_test_user()))
+
+        test_category.delete()
+        self.assertNotIn(test_category.pk, get_accessible_category_pks(User.objects.get(pk=self.test_user.pk)))
+
+        # The cache has to be shared by all processes:
+        self.assertEqual([error.id for error in check_accessible_categories_cache(None)], ['categories.E001'])
+
+    def test_accessible_categories_memoization(self):
+        """Test if the accessible categories are memoized per request and looked up by membership subqueries
+        """
+        test_user = User.objects.get(pk=self.test_user.pk)
+        with CaptureQueriesContext(connection) as queries:
+            get_accessible_category_pks(test_user)
+            get_accessible_category_pks(test_user)
+        self.assertEqual(len(queries), 1)
+
+        # The subqueries do not depend on the memoized (or cached) categories:
+        test_category = Category.objects.create(name='Category', description='Description', owner=self.test_user)
+        self.assertNotIn(test_category.pk, get_accessible_category_pks(test_user))
+        self.assertIn(test_category, Category.accessible_objects.all(test_user))
+        self.assertEqual(check_accessible_categories_cache(None), [])
+
     def test_share_contract_decline(self):
         """Test if a share contract can be declined
         """
@@ -161,14 +327,14 @@ class CategoryTestCase(TestCase):
         test_card = self._create_test_card(category=test_category)
         share_contract = ShareContract.objects.create(user=self.foreign_test_user, category=test_category)
         share_contract.accept()
+        run_on_commit_callbacks()
         card_placement = CardPlacement.objects.get(user=self.foreign_test_user, card=test_card)
         url = reverse('category-share-contract-revoke', args=(test_category.pk, share_contract.pk,))
         response = self.client.post(url)
         self.assertEqual(response.status_code, 302)
         refreshed_share_contract = ShareContract.objects.filter(pk=share_contract.pk).all()
         self.assertFalse(refreshed_share_contract.exists())
-        refreshed_card_placement = CardPlacement.objects.filter(
-            user=self.foreign_test_user,
-            card__category__name=rand,
-        ).first()
-        self.assertNotEqual(card_placement.card, refreshed_card_placement.card)
+        refreshed_card_placement = CardPlacement.objects.get(pk=card_placement.pk)
+        self.assertEqual(card_placement.card, refreshed_card_placement.card)
+        self.assertEqual(refreshed_card_placement.category.owner, self.foreign_test_user)
+        self.assertEqual(refreshed_card_placement.category.name, rand)
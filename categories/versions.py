@@ -0,0 +1,69 @@
+import time
+
+from django.core.cache import cache
+
+
+def _get_category_version_key(category_pk):
+    return 'category-version:{}'.format(category_pk)
+
+
+def _get_category_access_version_key(user_pk):
+    return 'category-access-version:{}'.format(user_pk)
+
+
+def get_category_version(category_pk):
+    """Returns the current version of a category's content (used for building cache keys)
+    """
+    return cache.get_or_set(_get_category_version_key(category_pk), _get_initial_version, timeout=None)
+
+
+def get_category_versions(category_pks):
+    """Returns the current versions of many categories by category ID using one cache lookup
+    """
+    keys = dict((_get_category_version_key(category_pk), category_pk) for category_pk in category_pks)
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = cache.get_or_set(key, _get_initial_version, timeout=None)
+    return dict((keys[key], version) for key, version in versions.items())
+
+
+def bump_category_version(category_pk):
+    """Increases the version of a category's content, which invalidates all cache keys built on top of it
+    """
+    _bump_version(_get_category_version_key(category_pk))
+
+
+def get_category_access_version(user_pk):
+    """Returns the current version of the categories a user can access (used for building cache keys)
+    """
+    return cache.get_or_set(_get_category_access_version_key(user_pk), _get_initial_version, timeout=None)
+
+
+def bump_category_access_version(user_pk):
+    """Increases the version of the categories a user can access, which invalidates all cache keys built on top of it
+    """
+    _bump_version(_get_category_access_version_key(user_pk))
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The version has not been cached yet (or it has been evicted):
+        cache.add(key, _get_initial_version(), timeout=None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # The version has been evicted again (or the cache does not store anything, e.g. DummyCache), so a new
+            # initial version is as good as an increased one:
+            cache.set(key, _get_initial_version(), timeout=None)
+
+
+def _get_initial_version():
+    """Returns the version of a key which is not cached (yet)
+
+    Versions start at the current time in milliseconds instead of 1, so a version which has been evicted from the cache
+    does not start over and match cache keys of its former life.
+    """
+    return int(time.time() * 1000)
@@ -8,6 +8,7 @@ from categories.views.gui import CategoryBelongsUserMixin
 class APICategoryList(CategoryBelongsUserMixin, generics.ListCreateAPIView):
     permission_classes = (IsAuthenticated,)
     serializer_class = CategorySerializer
+    keyset_ordering = ('name', 'pk')
 
 
 class APICategoryDetail(CategoryBelongsUserMixin, generics.RetrieveUpdateDestroyAPIView):
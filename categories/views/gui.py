@@ -1,12 +1,18 @@
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.paginator import Paginator
+from django.db.models import OuterRef
 from django.urls import reverse_lazy
 from django.views.generic.detail import DetailView
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
 from django.views.generic.list import ListView
 
+from braindump.counters import get_area_histogram
+from braindump.forks import get_card_count
 from braindump.models import CardPlacement
+from braindump.placements import CardPlacementList, get_virtual_card_placements
 from categories.models import Category
+from memodrop.pagination import KeysetPaginationMixin
 
 
 class CategoryBelongsOwnerMixin:
@@ -20,32 +26,48 @@ class CategoryBelongsUserMixin:
     """Mixin that returns all categories belonging to the authorized user
     """
     def get_queryset(self):
-        owned_category_list = Category.owned_objects.all(self.request.user)
-        shared_category_list = Category.shared_objects.all(self.request.user)
-        return owned_category_list | shared_category_list
+        return Category.accessible_objects.all(self.request.user)
 
 
-class CategoryList(LoginRequiredMixin, CategoryBelongsUserMixin, ListView):
+class CategoryList(LoginRequiredMixin, CategoryBelongsUserMixin, KeysetPaginationMixin, ListView):
     """List all categories
     """
     paginate_by = 25
-    paginate_orphans = 5
+    keyset_ordering = ('name', 'pk')
+
+    def get_queryset(self):
+        return super().get_queryset().annotate(card_count=get_card_count(OuterRef('pk'), OuterRef('owner')))
 
 
 class CategoryDetail(LoginRequiredMixin, CategoryBelongsUserMixin, DetailView):
     """Show detailed information about a category
     """
+    paginate_by = 25
+    paginate_orphans = 5
+
     def get_context_data(self, **kwargs):
         context = super(CategoryDetail, self).get_context_data(**kwargs)
-        context['card_placements'] = CardPlacement.user_objects.all(self.request.user).filter(
-            card__category=self.object.id,
-        ).all()
+        card_placement_list = CardPlacement.user_objects.all(self.request.user).filter(category=self.object.id)
+        virtual_card_placements = get_virtual_card_placements(self.request.user, self.object.id)
+
+        area_histogram = get_area_histogram(self.request.user, self.object.id)
+        if virtual_card_placements is not None:
+            # Cards which have not been placed for the user yet are in area 1:
+            area_histogram[1] = area_histogram.get(1, 0) + virtual_card_placements.count()
 
         for i in range(1, 7):
-            context['area{}'.format(i)] = CardPlacement.user_objects.all(self.request.user).filter(
-                card__category=self.object.id,
-                area=i,
-            ).all()
+            context['area{}'.format(i)] = area_histogram.get(i, 0)
+        context['card_count'] = sum(area_histogram.values())
+
+        # Virtual card placements (area 1) are listed first, so the list remains ordered by area:
+        paginator = Paginator(
+            CardPlacementList(card_placement_list.select_related('card', 'category').order_by('area', 'pk'),
+                              virtual_card_placements),
+            self.paginate_by,
+            orphans=self.paginate_orphans,
+        )
+        context['page_obj'] = paginator.get_page(self.request.GET.get('page'))
+        context['card_placements'] = context['page_obj'].object_list
 
         return context
 
@@ -0,0 +1,209 @@
+"""Keyset (seek) pagination
+
+Instead of counting all rows and skipping the rows of the previous pages (COUNT and OFFSET), a page is fetched by
+seeking the rows after the last row of the previous page within a stable ordering (e.g. area and ID). Every page costs
+the same, no matter how deep it is in the list. The position is passed around as an opaque cursor.
+"""
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(values, reverse=False):
+    """Encodes the ordering values of a row and the direction into a cursor
+    """
+    data = json.dumps({'v': values, 'r': reverse}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, ordering):
+    """Decodes a cursor into the ordering values of a row and the direction
+
+    Raises a ValueError if the cursor is invalid.
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        values, reverse = data['v'], data['r']
+    except (binascii.Error, KeyError, TypeError, UnicodeError, ValueError):
+        raise ValueError('Invalid cursor.')
+
+    if not isinstance(values, list) or len(values) != len(ordering) or not isinstance(reverse, bool):
+        raise ValueError('Invalid cursor.')
+    if not all(value is None or isinstance(value, (bool, int, float, str)) for value in values):
+        raise ValueError('Invalid cursor.')
+    return values, reverse
+
+
+def clean_cursor_values(queryset, ordering, values):
+    """Converts the ordering values of a cursor into the types of the ordering fields (or annotations)
+
+    Raises a ValueError if a value does not match its field.
+    """
+    cleaned_values = list()
+    for field_name, value in zip(ordering, values):
+        if field_name in queryset.query.annotations:
+            field = queryset.query.annotations[field_name].output_field
+        elif field_name == 'pk':
+            field = queryset.model._meta.pk
+        else:
+            field = queryset.model._meta.get_field(field_name)
+        try:
+            cleaned_values.append(field.to_python(value))
+        except ValidationError:
+            raise ValueError('Invalid cursor.')
+    return cleaned_values
+
+
+def get_keyset_filter(ordering, values, reverse=False):
+    """Returns a filter matching all rows after (or before) the given ordering values
+
+    (a, b) > (x, y) is expressed as a > x OR (a = x AND b > y), which every database can answer using an index on
+    (a, b).
+    """
+    lookup = 'lt' if reverse else 'gt'
+    keyset_filter = Q()
+    for i, field in enumerate(ordering):
+        condition = Q(**{'{}__{}'.format(field, lookup): values[i]})
+        for previous_field, previous_value in zip(ordering[:i], values[:i]):
+            condition &= Q(**{previous_field: previous_value})
+        keyset_filter |= condition
+    return keyset_filter
+
+
+class KeysetPage:
+    """Page of a keyset paginated queryset
+    """
+    def __init__(self, object_list, ordering, has_next, has_previous):
+        self.object_list = object_list
+        self.ordering = ordering
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    def get_values(self, obj):
+        """Returns the ordering values of a row
+        """
+        return [getattr(obj, field) for field in self.ordering]
+
+    def next_cursor(self):
+        """Returns the cursor of the next page (or None if this is the last page)
+        """
+        if not self.has_next_page:
+            return None
+        return encode_cursor(self.get_values(self.object_list[-1]))
+
+    def previous_cursor(self):
+        """Returns the cursor of the previous page (or None if this is the first page)
+        """
+        if not self.has_previous_page:
+            return None
+        return encode_cursor(self.get_values(self.object_list[0]), reverse=True)
+
+
+def paginate_by_keyset(queryset, ordering, page_size, cursor=None):
+    """Returns one page of a queryset, which is ordered by the given fields (the last one has to be unique)
+
+    Raises a ValueError if the cursor is invalid.
+    """
+    ordering = tuple(ordering)
+    values, reverse = decode_cursor(cursor, ordering) if cursor else (None, False)
+    if values is not None:
+        values = clean_cursor_values(queryset, ordering, values)
+
+    if reverse:
+        queryset = queryset.order_by(*('-{}'.format(field) for field in ordering))
+    else:
+        queryset = queryset.order_by(*ordering)
+    if values is not None:
+        queryset = queryset.filter(get_keyset_filter(ordering, values, reverse))
+
+    # Fetch one additional row to find out whether there is another page:
+    object_list = list(queryset[:page_size + 1])
+    has_more = len(object_list) > page_size
+    object_list = object_list[:page_size]
+
+    if reverse:
+        object_list.reverse()
+        return KeysetPage(object_list, ordering, has_next=True, has_previous=has_more)
+    return KeysetPage(object_list, ordering, has_next=has_more, has_previous=values is not None)
+
+
+class KeysetPaginationMixin:
+    """Mixin for list views which paginates the queryset by keyset instead of page number
+
+    The ordering has to be stable, so its last field has to be unique.
+    """
+    keyset_ordering = ('pk',)
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        try:
+            page = paginate_by_keyset(queryset, self.keyset_ordering, page_size,
+                                      self.request.GET.get(self.cursor_query_param))
+        except ValueError:
+            raise Http404('Invalid cursor.')
+        return None, page, page.object_list, page.has_other_pages()
+
+
+class KeysetCursorPagination(BasePagination):
+    """Cursor pagination for the REST API, based on the keyset_ordering of the view (defaults to the ID)
+
+    Unlike the CursorPagination of the REST framework, the cursor contains all ordering values, so no offset is
+    required for rows sharing the same value of the first ordering field.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = getattr(view, 'keyset_ordering', ('pk',))
+        try:
+            self.page = paginate_by_keyset(queryset, ordering, self.page_size,
+                                           request.query_params.get(self.cursor_query_param))
+        except ValueError:
+            raise NotFound('Invalid cursor.')
+        return self.page.object_list
+
+    def get_link(self, cursor):
+        """Returns the URL of the current request with the given cursor
+        """
+        if cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self.get_link(self.page.next_cursor())
+
+    def get_previous_link(self):
+        return self.get_link(self.page.previous_cursor())
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
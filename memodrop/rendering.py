@@ -0,0 +1,55 @@
+"""Pre-rendered Markdown
+
+Models store the HTML of their Markdown fields in <field>_html columns, which are rendered whenever an instance is
+saved. Pages and API responses use the stored HTML, so Markdown is rendered once per change instead of once per view.
+Instances which have been written without calling save() (e.g. bulk inserts) can be rendered afterwards using the
+render_markdown management command.
+"""
+from markdown_deux import markdown
+
+
+def render_markdown(text):
+    """Renders Markdown into HTML using the default style of markdown_deux (which escapes raw HTML)
+    """
+    return markdown(text)
+
+
+class RenderedMarkdownMixin:
+    """Mixin for models which store the rendered HTML of their markdown_fields
+    """
+    markdown_fields = ()
+
+    def render_markdown_fields(self):
+        """Renders all Markdown fields into their HTML fields and returns the names of the HTML fields
+        """
+        html_fields = list()
+        for field in self.markdown_fields:
+            setattr(self, '{}_html'.format(field), render_markdown(getattr(self, field)))
+            html_fields.append('{}_html'.format(field))
+        return html_fields
+
+    def save(self, *args, **kwargs):
+        html_fields = self.render_markdown_fields()
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = set(kwargs['update_fields']) | set(html_fields)
+        super().save(*args, **kwargs)
+
+
+def render_queryset_markdown(queryset, batch_size=500):
+    """Renders the Markdown fields of all instances of a queryset and stores the HTML using bulk updates
+
+    Returns the number of rendered instances.
+    """
+    html_fields = ['{}_html'.format(field) for field in queryset.model.markdown_fields]
+    instances = list()
+    count = 0
+
+    for instance in queryset.order_by('pk').iterator(chunk_size=batch_size):
+        instance.render_markdown_fields()
+        instances.append(instance)
+        if len(instances) == batch_size:
+            queryset.model.objects.bulk_update(instances, html_fields)
+            count += len(instances)
+            instances = list()
+    queryset.model.objects.bulk_update(instances, html_fields)
+    return count + len(instances)
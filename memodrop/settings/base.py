@@ -137,7 +137,7 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'memodrop.pagination.KeysetCursorPagination',
     'PAGE_SIZE': 30,
 }
 
@@ -147,11 +147,49 @@ REST_FRAMEWORK = {
 LOGIN_URL = 'authentication-login'
 LOGIN_REDIRECT_URL = 'index'
 
+# Number of seconds the statistics of the profile page are cached (they are invalidated on changes anyway):
+AUTHENTICATION_STATISTICS_CACHE_TIMEOUT = 3600
+
+
+# Categories
+
+# Filter categories and cards by the accessible category IDs cached per user instead of a membership subquery (requires
+# a cache backend shared by all processes):
+CATEGORIES_CACHE_ACCESSIBLE_CATEGORIES = False
+
 
 # Braindump
 
 BRAINDUMP_MAX_POSTPONE_SECONDS = 3600
 
+# Strategy for picking a random card (braindump.selectors.RandomOrderCardSelector is the legacy ORDER BY RANDOM()):
+BRAINDUMP_CARD_SELECTOR = 'braindump.selectors.RandomKeyCardSelector'
+
+# Number of cards drawn in advance for every Braindump session (0 disables the review queue):
+BRAINDUMP_REVIEW_QUEUE_SIZE = 0
+BRAINDUMP_REVIEW_QUEUE_REFILL_THRESHOLD = 5
+
+# Number of seconds a lock of a review queue is held (e.g. if the process holding it crashed) and waited for at most:
+BRAINDUMP_REVIEW_QUEUE_LOCK_TIMEOUT = 5
+
+# Maximum number of reviews submitted to the API at once:
+BRAINDUMP_MAX_REVIEWS_PER_REQUEST = 1000
+
+# Number of cards processed per query when a share contract gets accepted or revoked:
+BRAINDUMP_CARD_PLACEMENT_BATCH_SIZE = 500
+
+# Create the card placements of shared users for new cards asynchronously if a category has been shared with more
+# users than this (0 creates them synchronously):
+BRAINDUMP_DEFERRED_FAN_OUT_THRESHOLD = 0
+
+# Create the card placements of shared users on their first interaction with a card (missing card placements are
+# treated as area 1):
+BRAINDUMP_LAZY_CARD_PLACEMENTS = False
+
+# Number of seconds the category tiles of the Braindump index are cached (they are invalidated on changes anyway, but
+# only within the processes sharing the cache, so 0 disables the cache by default):
+BRAINDUMP_INDEX_TILE_CACHE_TIMEOUT = 0
+
 
 # User specific GUI settings (defaults)
 
@@ -32,7 +32,8 @@ urlpatterns = [
     url(r'^api/(?P<version>(v1))/auth-token/', auth_token_views.obtain_auth_token),
     url(r'^api/(?P<version>(v1))/categories/', include('categories.urls.api')),
     url(r'^api/(?P<version>(v1))/cards/', include('cards.urls.api')),
-    url(r'^braindump/', include('braindump.urls')),
+    url(r'^api/(?P<version>(v1))/braindump/', include('braindump.urls.api')),
+    url(r'^braindump/', include('braindump.urls.gui')),
     url(r'^cards/', include('cards.urls.gui')),
     url(r'^categories/', include('categories.urls.gui')),
 ]
@@ -31,7 +31,6 @@ setup(
         'django-watchman~=0.17',
         'djangorestframework~=3.9',
         'markdown2~=2.3',
-        'numpy~=1.16',
         'pytz==2019.1',
     ],
     extras_require={